@@ -0,0 +1,48 @@
+"""Sequential vs concurrent s02e05.SimpleAnswerer against a mock chat endpoint.
+
+Usage: python benchmarks/bench_answering.py [--questions 30] [--latency 0.5]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_openai import MockOpenAIServer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[4, 16])
+    args = parser.parse_args()
+
+    questions = "\n".join(f"{i:02d}=Pytanie numer {i}?" for i in range(1, args.questions + 1))
+    with MockOpenAIServer(latency=args.latency) as server:
+        server.static["/questions.txt"] = ("text/plain", questions.encode("utf-8"))
+        from openai import OpenAI
+        from s02e05 import SimpleAnswerer
+        from modules.LlmGateway import LlmGateway
+
+        client = OpenAI(api_key="mock-key", base_url=server.base_url)
+        # No response cache, every mode has to reach the endpoint
+        gateway = LlmGateway(sync_client=client, cache_dir=None)
+        answerer = SimpleAnswerer(server.url("/questions.txt"), client, "Kontekst artykułu. " * 200, gateway=gateway)
+
+        print(f"{args.questions} questions, {args.latency:.2f}s simulated latency per call")
+        print(f"{'mode':<16} {'seconds':>8} {'questions/s':>12}")
+        start = time.perf_counter()
+        answers = answerer.generate_answers_without_qa()
+        elapsed = time.perf_counter() - start
+        print(f"{'sequential':<16} {elapsed:>8.2f} {len(answers) / elapsed:>12.2f}")
+        for concurrency in args.concurrency:
+            start = time.perf_counter()
+            answers = answerer.generate_answers_concurrently(max_concurrency=concurrency)
+            elapsed = time.perf_counter() - start
+            print(f"{'concurrent x' + str(concurrency):<16} {elapsed:>8.2f} {len(answers) / elapsed:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Coverage and throughput of ContextBuilder against the old single-shot context call.
+
+Every input carries a unique marker; the mock echoes the user message cut to
+max_tokens, so a marker missing from the result is text the model never saw.
+
+Usage: python benchmarks/bench_context_builder.py [--inputs 20] [--words 1500] [--latency 0.5]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openai import AsyncOpenAI
+
+from benchmarks.mock_openai import MockOpenAIServer
+from modules.ContextBuilder import ContextBuilder
+from modules.LlmGateway import LlmGateway
+
+
+def make_texts(count, words):
+    filler = " ".join(f"slowo{i % 97}" for i in range(words))
+    return [f"MARKER-{i:03d} {filler}" for i in range(count)]
+
+
+async def single_shot(client, texts):
+    # What Answerer.build_common_context used to do
+    response = await client.chat.completions.create(
+        messages=[
+            {"role": "system", "content": "Translate all files in english. Add content of the files as they are"},
+            {"role": "user", "content": " ".join(texts)},
+        ],
+        model='gpt-4o',
+        max_tokens=2000
+    )
+    return response.choices[0].message.content.strip()
+
+
+def coverage(texts, result):
+    return sum(f"MARKER-{i:03d}" in result for i in range(len(texts)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--inputs", type=int, default=20)
+    parser.add_argument("--words", type=int, default=1500)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+
+    texts = make_texts(args.inputs, args.words)
+    with MockOpenAIServer(latency=args.latency, echo=True) as server:
+        client = AsyncOpenAI(api_key="mock-key", base_url=server.base_url)
+        print(f"{args.inputs} inputs of ~{args.words} words, {args.latency:.2f}s simulated latency per call")
+        print(f"{'method':<26} {'seconds':>8} {'requests':>9} {'inputs kept':>12}")
+
+        runs = [("single shot", lambda: single_shot(client, texts))]
+        for concurrency in (1, 4):
+            gateway = LlmGateway(async_client=client, cache_dir=None)
+            builder = ContextBuilder(gateway, "Add content of the files as they are", concurrency=concurrency)
+            runs.append((f"ContextBuilder c={concurrency}", lambda builder=builder: builder.build(texts)))
+
+        for label, run in runs:
+            before = server.request_count
+            start = time.perf_counter()
+            result = asyncio.run(run())
+            elapsed = time.perf_counter() - start
+            kept = coverage(texts, result)
+            print(f"{label:<26} {elapsed:>8.2f} {server.request_count - before:>9} {kept:>5}/{len(texts):<6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""s02e05.SiteCrawler against a local static site: one page at a time vs concurrent crawling.
+
+The fixture is a tree of linked HTML pages with cross links, fragment and
+external links, a non-HTML file, the home page under three URLs and one
+image per few pages. It is served from a temporary directory with
+a fixed delay per request. Image descriptions go to the mock OpenAI server.
+Every configuration starts from an empty media cache. The peak column is
+the most requests the site served at once, which should never exceed the
+per-host limit. A second, tiny site checks that a page reached first
+through a long path is still followed when a shorter path turns up later.
+
+Usage: python benchmarks/bench_crawler.py [--pages 60] [--latency 0.1] [--max-depth 6] [--concurrency 1 4 8]
+"""
+import argparse
+import contextlib
+import functools
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_openai import MockOpenAIServer
+
+
+def make_site(root, pages, image_every=3):
+    from PIL import Image
+
+    os.makedirs(os.path.join(root, "media"), exist_ok=True)
+    with open(os.path.join(root, "media", "report.pdf"), "wb") as file:
+        file.write(b"%PDF-1.4 " + bytes(4096))
+    for i in range(pages):
+        children = [child for child in (2 * i + 1, 2 * i + 2) if child < pages]
+        links = [f'<a href="/page{child}.html">Strona {child}</a>' for child in children]
+        # Cross links and variants of known URLs exercise the deduplication
+        links += [f'<a href="/page{(i * 7) % pages}.html#sekcja">Zobacz też</a>', '<a href="/">Start</a>',
+                  '<a href="http://example.invalid/">Zewnętrzny</a>', '<a href="/media/report.pdf">Raport</a>']
+        body = [f"<h1>Strona {i}</h1>"]
+        body += [f"<p>Akapit {j} strony {i}. " + "Profesor Maj prowadził badania nad podróżami w czasie. " * 12 + "</p>"
+                 for j in range(3)]
+        if i % image_every == 0:
+            name = f"figure{i}.png"
+            Image.effect_noise((64, 48), 20 + i % 50).convert("RGB").save(os.path.join(root, "media", name))
+            body.append(f'<img src="media/{name}">')
+        html = f"<html><body>{''.join(body)}<nav>{' '.join(links)}</nav></body></html>"
+        with open(os.path.join(root, f"page{i}.html"), "w", encoding="utf-8") as file:
+            file.write(html)
+        if i == 0:
+            # The home page is also reachable as / and /index.html, with the same body
+            with open(os.path.join(root, "index.html"), "w", encoding="utf-8") as file:
+                file.write(html)
+
+
+def make_depth_site(root):
+    """/ -> /a (slow) and /b, /b -> /c, /a and /c -> /x: /x is 2 clicks away, but /c usually finds it first at 3."""
+    links = {"index": ["a", "b"], "a": ["x"], "b": ["c"], "c": ["x"], "x": []}
+    for name, targets in links.items():
+        anchors = " ".join(f'<a href="/{target}.html">{target}</a>' for target in targets)
+        with open(os.path.join(root, f"{name}.html"), "w", encoding="utf-8") as file:
+            file.write(f"<html><body><p>Strona {name}</p>{anchors}</body></html>")
+
+
+def check_depth(client, latency):
+    from s02e05 import IndexHtml, SiteCrawler
+
+    with tempfile.TemporaryDirectory() as root, tempfile.TemporaryDirectory() as workdir, \
+            contextlib.redirect_stdout(io.StringIO()):
+        make_depth_site(root)
+        site = StaticSite(root, latency, slow={"/a.html": 4 * latency})
+        try:
+            crawler = SiteCrawler(IndexHtml(client), max_depth=2, max_concurrency=4)
+            pages = crawler.crawl_site(site.url("/index.html"), workdir)["pages"]
+        finally:
+            site.close()
+    fetched = sorted(urlsplit(page["url"]).path for page in pages if page["status"] == "ok")
+    print(f"shorter path found late (max depth 2): fetched {', '.join(fetched)} -> "
+          f"{'ok' if '/x.html' in fetched else 'MISSING /x.html'}")
+
+
+class StaticSite:
+    """Serves a directory over HTTP after a fixed delay and remembers the peak number of requests in flight."""
+
+    def __init__(self, root, latency, slow=None):
+        self.latency = latency
+        # Extra delay for some paths, {path: seconds}
+        self.slow = slow or {}
+        self.in_flight = 0
+        self.peak = 0
+        self.requests = 0
+        self.lock = threading.Lock()
+        site = self
+
+        class Handler(SimpleHTTPRequestHandler):
+            def do_GET(self):
+                with site.lock:
+                    site.requests += 1
+                    site.in_flight += 1
+                    site.peak = max(site.peak, site.in_flight)
+                try:
+                    time.sleep(site.latency + site.slow.get(self.path, 0))
+                    super().do_GET()
+                finally:
+                    with site.lock:
+                        site.in_flight -= 1
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(Handler, directory=root))
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server.server_address[1]}{path}"
+
+    def reset(self):
+        with self.lock:
+            self.peak = self.requests = 0
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=60)
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds per request to the site and to the API")
+    parser.add_argument("--max-depth", type=int, default=6)
+    parser.add_argument("--max-pages", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--per-host", type=int, default=4)
+    parser.add_argument("--verbose", action="store_true", help="show the crawler's own output")
+    args = parser.parse_args()
+
+    with MockOpenAIServer(latency=args.latency) as api, tempfile.TemporaryDirectory() as root:
+        os.environ["OPENAI_BASE_URL"] = api.base_url
+        from openai import OpenAI
+        from s02e05 import IndexHtml, SiteCrawler
+
+        make_site(root, args.pages)
+        site = StaticSite(root, args.latency)
+        client = OpenAI(api_key="mock-key")
+        print(f"{args.pages} pages, {args.latency:.2f}s per request, depth <= {args.max_depth}, "
+              f"{args.per_host} requests per host")
+        print(f"{'concurrency':>11} {'seconds':>8} {'pages/s':>8} {'pages':>6} {'dup body':>9} {'dup url':>8} "
+              f"{'skipped':>8} {'chars':>8} {'API calls':>10} {'peak':>5}")
+        try:
+            for concurrency in args.concurrency:
+                site.reset()
+                calls = api.request_count
+                crawler = SiteCrawler(IndexHtml(client), max_depth=args.max_depth, max_pages=args.max_pages,
+                                      max_concurrency=concurrency, per_host=min(concurrency, args.per_host))
+                output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+                with tempfile.TemporaryDirectory() as workdir, output:
+                    start = time.perf_counter()
+                    result = crawler.crawl_site(site.url("/index.html"), workdir)
+                    elapsed = time.perf_counter() - start
+                stats = crawler.stats
+                print(f"{concurrency:>11} {elapsed:>8.2f} {stats['pages'] / elapsed:>8.1f} {stats['pages']:>6} "
+                      f"{stats['duplicate_bodies']:>9} {stats['duplicate_urls']:>8} {stats['skipped']:>8} "
+                      f"{len(result['context']):>8} {api.request_count - calls:>10} {site.peak:>5}")
+        finally:
+            site.close()
+        check_depth(client, args.latency)
+
+
+if __name__ == "__main__":
+    main()
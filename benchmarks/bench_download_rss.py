@@ -0,0 +1,145 @@
+"""Peak RSS of downloading a large audio-sized file: response.content vs HttpClient.download.
+
+Each method runs in its own subprocess against a local server that streams
+generated bytes and honours Range and If-Range requests; a resume run starts
+from a half-written .part file. Two more runs start from a .part of an older
+version of the resource, one with a changed ETag and one with a changed
+total size. Both must end with the current bytes only.
+
+Usage: python benchmarks/bench_download_rss.py [--megabytes 200]
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import os, resource, sys, time
+sys.path.insert(0, {root!r})
+method, url, path = sys.argv[1:4]
+start = time.perf_counter()
+if method == "content":
+    import requests
+    response = requests.get(url)
+    with open(path, "wb") as file:
+        file.write(response.content)
+else:
+    from modules.HttpClient import HttpClient
+    HttpClient().download(url, path)
+elapsed = time.perf_counter() - start
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, elapsed, os.path.getsize(path))
+"""
+
+
+class GeneratedFileHandler(BaseHTTPRequestHandler):
+    size = 0
+    block = bytes(range(256)) * 4096  # 1 MiB
+    served = 0
+    etag = '"v2"'
+    # False serves every Range request, the way a server without If-Range support does
+    honour_if_range = True
+
+    def do_GET(self):
+        start, end = 0, self.size - 1
+        match = re.match(r"bytes=(\d+)-", self.headers.get("Range", ""))
+        if_range = self.headers.get("If-Range")
+        if match and (not self.honour_if_range or if_range in (None, self.etag)):
+            start = int(match.group(1))
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{self.size}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "audio/mpeg")
+        self.send_header("ETag", self.etag)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        position = start
+        try:
+            while position <= end:
+                offset = position % len(self.block)
+                data = self.block[offset:offset + min(len(self.block) - offset, end - position + 1)]
+                self.wfile.write(data)
+                position += len(data)
+                GeneratedFileHandler.served += len(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client dropped a response it could not use
+
+    def log_message(self, format, *args):
+        pass
+
+
+def write_part(path, megabytes, block, etag, size):
+    # Written block by block, a forked child starts with the parent's peak RSS on Linux
+    with open(path + ".part", "wb") as part:
+        for _ in range(megabytes):
+            part.write(block)
+    with open(path + ".part.json", "w", encoding="utf-8") as file:
+        json.dump({"etag": etag, "last_modified": None, "size": str(size)}, file)
+
+
+def matches_server(path):
+    block = GeneratedFileHandler.block
+    with open(path, "rb") as file:
+        return (os.path.getsize(path) == GeneratedFileHandler.size
+                and all(chunk == block[:len(chunk)] for chunk in iter(lambda: file.read(len(block)), b"")))
+
+
+def run_child(method, url, path):
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD.format(root=ROOT), method, url, path],
+        capture_output=True, text=True, check=True,
+    ).stdout.split()
+    # ru_maxrss is in KiB on Linux
+    return int(output[0]) / 1024, float(output[1]), int(output[2])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--megabytes", type=int, default=200)
+    args = parser.parse_args()
+
+    GeneratedFileHandler.size = args.megabytes * 1024 * 1024
+    server = ThreadingHTTPServer(("127.0.0.1", 0), GeneratedFileHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/recording.mp3"
+
+    print(f"{args.megabytes} MiB file")
+    print(f"{'method':<22} {'peak RSS MiB':>13} {'seconds':>8} {'MiB sent':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "recording.mp3")
+        for label, method in [("response.content", "content"), ("HttpClient.download", "stream")]:
+            GeneratedFileHandler.served = 0
+            rss, elapsed, _ = run_child(method, url, path)
+            print(f"{label:<22} {rss:>13.1f} {elapsed:>8.2f} {GeneratedFileHandler.served / 2 ** 20:>9.1f}")
+            os.remove(path)
+
+        # Resume: half of the file is already on disk from an interrupted run of the same version
+        old_block = b"OLD-" * (len(GeneratedFileHandler.block) // 4)
+        runs = [
+            ("resumed from .part", GeneratedFileHandler.block, GeneratedFileHandler.etag, GeneratedFileHandler.size, True),
+            # The resource changed since the .part was written: If-Range makes the server send it whole
+            (".part, ETag changed", old_block, '"v1"', GeneratedFileHandler.size, True),
+            # A server without If-Range sends the range, the total in Content-Range gives the change away
+            (".part, size changed", old_block, GeneratedFileHandler.etag, GeneratedFileHandler.size // 2, False),
+        ]
+        for label, block, etag, size, honour_if_range in runs:
+            if os.path.exists(path):
+                os.remove(path)
+            write_part(path, args.megabytes // 2, block, etag, size)
+            GeneratedFileHandler.honour_if_range = honour_if_range
+            GeneratedFileHandler.served = 0
+            rss, elapsed, _ = run_child("stream", url, path)
+            print(f"{label:<22} {rss:>13.1f} {elapsed:>8.2f} {GeneratedFileHandler.served / 2 ** 20:>9.1f}")
+            assert matches_server(path), f"{label}: the file does not match the server's bytes"
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Time and peak memory of HTML text extraction: BeautifulSoup + `+=` vs the streaming parser.
+
+Also checks that Utils.split_stream, which chunks the streamed text for the
+knowledge base, keeps every word of what split_text makes of the whole
+text. No word may be lost, and no two words may be glued at a buffer edge.
+
+Usage: python benchmarks/bench_html_extract.py [--megabytes 2 8]
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+from s02e05 import IndexHtml, Utils
+
+
+def make_html(megabytes):
+    paragraph = "<p>Profesor Andrzej Maj wykładał na wydziale przy ulicy Łojasiewicza w Krakowie.</p>\n"
+    count = megabytes * 1024 * 1024 // len(paragraph.encode("utf-8"))
+    return "<html><body><article>\n" + paragraph * count + "</article></body></html>"
+
+
+def soup_concat(html, context_path):
+    # The previous IndexHtml.index_webpage text path
+    soup = BeautifulSoup(html, "html.parser")
+    text_content = ""
+    for element in soup.descendants:
+        if element.name is None:
+            text_content += element.strip() + "\n"
+    with open(context_path, "w", encoding="utf-8") as file:
+        file.write(text_content)
+
+
+def streaming(html, context_path):
+    source = io.StringIO(html)
+    chunks = iter(lambda: source.read(64 * 1024), "")
+    with open(context_path, "w", encoding="utf-8") as file:
+        for kind, value in IndexHtml.iter_segments(chunks, "http://localhost/"):
+            if kind == "text":
+                file.write(value + "\n")
+
+
+def measure(func, html, context_path):
+    # Timed and traced in separate runs, tracemalloc slows allocations down a lot
+    start = time.perf_counter()
+    func(html, context_path)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func(html, context_path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def check_split_stream(words=5000, words_per_line=7, buffer_size=2000):
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=100)
+    vocabulary = [f"w{i}" for i in range(words)]
+    lines = [" ".join(vocabulary[i:i + words_per_line]) + "\n" for i in range(0, words, words_per_line)]
+    expected = set(" ".join(splitter.split_text("".join(lines))).split())
+    streamed = set(" ".join(Utils.split_stream(lines, splitter, buffer_size=buffer_size)).split())
+    print(f"split_stream: {len(expected - streamed)} words lost, {len(streamed - expected)} glued tokens "
+          f"({words} words, {buffer_size}-character buffer)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--megabytes", type=int, nargs="+", default=[2, 8])
+    args = parser.parse_args()
+
+    print(f"{'size':>6} {'extractor':<14} {'seconds':>8} {'peak MiB':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        context_path = os.path.join(directory, "context.txt")
+        for megabytes in args.megabytes:
+            html = make_html(megabytes)
+            for name, func in [("soup + concat", soup_concat), ("streaming", streaming)]:
+                elapsed, peak = measure(func, html, context_path)
+                print(f"{megabytes:>4}MB {name:<14} {elapsed:>8.2f} {peak / 2 ** 20:>9.1f}")
+    check_split_stream()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Vision calls saved by modules.ImageDedup on a folder of images with resized and re-encoded copies.
+
+Every distinct image gets a few variants: downscaled, JPEG-recompressed and
+slightly cropped. The clustering is checked against the known groups. A
+false merge means two different images share a cluster, and one of them
+would get the wrong description. pHash is not crop-invariant, so the
+thresholds leave most crops in their own cluster rather than risk false
+merges. Then s02e02.ImageRecognizer.recognize_images (batch clustering) and
+s02e05's Utils.get_cached_or_generate_description (online, images arriving
+concurrently) run against the mock vision endpoint with and without
+deduplication.
+
+Usage: python benchmarks/bench_image_dedup.py [--images 12] [--copies 3] [--latency 0.3]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_openai import MockOpenAIServer
+
+
+def make_images(directory, images, copies):
+    """Writes the images and their variants, returns {file name: index of the original}."""
+    from PIL import Image, ImageDraw
+
+    groups = {}
+    variants = [
+        lambda image: image.resize((image.width // 2, image.height // 2)),
+        lambda image: Image.open(io.BytesIO(jpeg(image, 30))),
+        lambda image: image.crop((image.width // 40, image.height // 40, image.width, image.height)),
+        lambda image: image.resize((image.width // 4, image.height // 4)),
+    ]
+    for i in range(images):
+        noise = Image.effect_noise((240, 135), 40 + i).resize((1280, 720), Image.BILINEAR)
+        image = Image.merge("RGB", (noise, noise.rotate(180), Image.new("L", (1280, 720), 128)))
+        draw = ImageDraw.Draw(image)
+        for line in range(0, 1280, 40):
+            draw.line([(line, 0), (1280 - line, 720)], fill=(i * 7 % 255, 120, 200), width=3)
+        image.save(os.path.join(directory, f"{i}.png"))
+        groups[f"{i}.png"] = i
+        for copy in range(copies):
+            name = f"{i}_copy{copy}.png"
+            variants[copy % len(variants)](image).convert("RGB").save(os.path.join(directory, name))
+            groups[name] = i
+    return groups
+
+
+def jpeg(image, quality):
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def check_clusters(directory, groups):
+    from modules.ImageDedup import ImageDeduplicator
+
+    deduplicator = ImageDeduplicator()
+    start = time.perf_counter()
+    clusters = deduplicator.cluster(os.path.join(directory, name) for name in groups)
+    elapsed = time.perf_counter() - start
+    false_merges = sum(len({groups[os.path.basename(path)] for path in copies}) > 1 for copies in clusters.values())
+    originals = len(set(groups.values()))
+    print(f"clustering: {len(groups)} files -> {len(clusters)} clusters ({originals} originals), "
+          f"{false_merges} false merges, {len(groups) / elapsed:.0f} images/s hashed")
+
+
+def run_s02e02(server, directory, dedupe):
+    from s02e02 import ImageRecognizer
+
+    descriptions = os.path.join(tempfile.mkdtemp(), "descriptions.txt")
+    recognizer = ImageRecognizer("mock-key", directory, concurrency=4, descriptions_file_path=descriptions,
+                                 dedupe=dedupe)
+    asyncio.run(recognizer.recognize_images())
+
+
+def run_s02e05(server, directory, dedupe):
+    from openai import OpenAI
+    from modules.ImageDedup import ImageDeduplicator
+    from s02e05 import Utils
+
+    client = OpenAI(api_key="mock-key")
+    # A fresh deduplicator per run; a threshold below zero never matches anything
+    Utils.image_deduplicator = ImageDeduplicator() if dedupe else ImageDeduplicator(phash_distance=-1)
+    paths = [os.path.join(directory, name) for name in sorted(os.listdir(directory)) if name.endswith(".png")]
+    with tempfile.TemporaryDirectory() as cache_dir, ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(lambda path: Utils.get_cached_or_generate_description(client, path, cache_dir), paths))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", type=int, default=12)
+    parser.add_argument("--copies", type=int, default=3, help="variants of every image")
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--verbose", action="store_true", help="show the scripts' own output")
+    args = parser.parse_args()
+
+    with MockOpenAIServer(latency=args.latency) as server, tempfile.TemporaryDirectory() as directory:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        groups = make_images(directory, args.images, args.copies)
+        check_clusters(directory, groups)
+
+        from modules.LlmGateway import get_gateway
+        get_gateway(api_key="mock-key", cache_dir=None)
+        print(f"{'pipeline':<10} {'dedupe':>6} {'seconds':>8} {'vision calls':>13}")
+        for name, run in (("s02e02", run_s02e02), ("s02e05", run_s02e05)):
+            for dedupe in (False, True):
+                calls = server.counts.get("chat/completions", 0)
+                output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+                with output:
+                    start = time.perf_counter()
+                    run(server, directory, dedupe)
+                    elapsed = time.perf_counter() - start
+                print(f"{name:<10} {'yes' if dedupe else 'no':>6} {elapsed:>8.2f} "
+                      f"{server.counts.get('chat/completions', 0) - calls:>13}")
+
+
+if __name__ == "__main__":
+    main()
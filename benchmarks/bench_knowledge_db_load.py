@@ -0,0 +1,69 @@
+"""Cold vs warm start of s02e05.KnowledgeDb with a persisted FAISS index.
+
+Embeddings are faked with a fixed per-call delay standing in for the API
+round-trip, so the numbers show what the persisted index saves.
+
+Usage: python benchmarks/bench_knowledge_db_load.py [--paragraphs 2000] [--embed-latency 0.2]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+
+class SlowFakeEmbedding(DeterministicFakeEmbedding):
+    latency: float = 0.2
+    calls: int = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        time.sleep(self.latency)
+        return super().embed_documents(texts)
+
+
+def make_text(paragraphs, seed=0):
+    rng = random.Random(seed)
+    words = ["profesor", "instytut", "ulica", "Kraków", "Warszawa", "badania", "uczelnia", "rok", "miasto", "wydział"]
+    return "\n\n".join(
+        " ".join(rng.choice(words) for _ in range(rng.randint(40, 120))) + f" ({i})"
+        for i in range(paragraphs)
+    )
+
+
+def timed(label, knowledge_db, text):
+    start = time.perf_counter()
+    vectorstore = knowledge_db.build_vectorstore(text)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed:>8.2f}s  vectors={vectorstore.index.ntotal}  embed_calls={knowledge_db.embeddings.calls}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--paragraphs", type=int, default=2000)
+    parser.add_argument("--embed-latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    from s02e05 import KnowledgeDb
+
+    text = make_text(args.paragraphs)
+    changed = text + "\n\n" + make_text(args.paragraphs // 20, seed=1)
+
+    def knowledge_db(index_dir):
+        return KnowledgeDb("mock-key", index_dir=index_dir,
+                           embeddings=SlowFakeEmbedding(size=1536, latency=args.embed_latency))
+
+    with tempfile.TemporaryDirectory() as index_dir:
+        timed("cold start (empty index)", knowledge_db(index_dir), text)
+        timed("warm start (unchanged)", knowledge_db(index_dir), text)
+        timed("incremental (+5% text)", knowledge_db(index_dir), changed)
+        timed("in-memory rebuild", knowledge_db(None), changed)
+
+
+if __name__ == "__main__":
+    main()
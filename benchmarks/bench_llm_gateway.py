@@ -0,0 +1,65 @@
+"""Requests saved by LlmGateway: in-flight coalescing and the temperature-0 disk cache.
+
+Callers ask a handful of distinct prompts many times over, all at once; a
+second pass runs the same workload against the warm cache.
+
+Usage: python benchmarks/bench_llm_gateway.py [--calls 64] [--distinct 8] [--latency 0.5]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openai import AsyncOpenAI
+
+from benchmarks.mock_openai import MockOpenAIServer
+from modules.LlmGateway import LlmGateway
+
+
+async def direct(client, prompts):
+    return await asyncio.gather(*(
+        client.chat.completions.create(model="gpt-4o", temperature=0, max_tokens=100,
+                                       messages=LlmGateway.messages("Answer briefly.", [prompt]))
+        for prompt in prompts
+    ))
+
+
+async def through_gateway(gateway, prompts):
+    return await asyncio.gather(*(
+        gateway.acomplete("Answer briefly.", prompt, max_tokens=100, temperature=0) for prompt in prompts
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=64)
+    parser.add_argument("--distinct", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+
+    prompts = [f"Question {i % args.distinct}?" for i in range(args.calls)]
+    with MockOpenAIServer(latency=args.latency) as server, tempfile.TemporaryDirectory() as directory:
+        client = AsyncOpenAI(api_key="mock-key", base_url=server.base_url)
+        gateway = LlmGateway(async_client=client, cache_dir=directory)
+        print(f"{args.calls} calls over {args.distinct} distinct prompts, {args.latency:.2f}s simulated latency per call")
+        print(f"{'mode':<22} {'seconds':>8} {'requests':>9}")
+        runs = [
+            ("direct client", lambda: direct(client, prompts)),
+            ("gateway, cold cache", lambda: through_gateway(gateway, prompts)),
+            ("gateway, warm cache", lambda: through_gateway(gateway, prompts)),
+        ]
+        for label, run in runs:
+            before = server.request_count
+            start = time.perf_counter()
+            asyncio.run(run())
+            elapsed = time.perf_counter() - start
+            print(f"{label:<22} {elapsed:>8.2f} {server.request_count - before:>9}")
+        gateway.report()
+
+
+if __name__ == "__main__":
+    main()
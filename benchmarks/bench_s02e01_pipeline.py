@@ -0,0 +1,60 @@
+"""Latency, requests and prompt tokens: the old three-call s02e01 flow vs Answerer.run_pipeline.
+
+Usage: python benchmarks/bench_s02e01_pipeline.py [--files 6] [--words 800] [--latency 0.5]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_openai import MockOpenAIServer
+
+QUESTION = "Write the name of the street, where the institute is located, where the professor teaches."
+
+
+def legacy(answerer):
+    # Three event loops, the context is uploaded twice more after it is built
+    texts = answerer.read_txt_files()
+    context = asyncio.run(answerer.build_common_context(texts))
+    answer = asyncio.run(answerer.answer_question(context, QUESTION))
+    return asyncio.run(answerer.extract_question("Extract single word answer from the context", answer, "What is the street name?"))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=6)
+    parser.add_argument("--words", type=int, default=800)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+
+    with MockOpenAIServer(latency=args.latency, echo=True) as server, tempfile.TemporaryDirectory() as directory:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        from s02e01 import Answerer
+        from modules.LlmGateway import LlmGateway
+
+        for i in range(args.files):
+            with open(os.path.join(directory, f"{i}.txt"), "w", encoding="utf-8") as file:
+                file.write(" ".join(f"transkrypcja{i}-{j % 50}" for j in range(args.words)))
+
+        print(f"{args.files} transcripts of {args.words} words, {args.latency:.2f}s simulated latency per call")
+        print(f"{'method':<14} {'seconds':>8} {'requests':>9} {'prompt tokens':>14}")
+        runs = [
+            ("three calls", lambda answerer: legacy(answerer)),
+            ("run_pipeline", lambda answerer: asyncio.run(answerer.run_pipeline(QUESTION))),
+        ]
+        for label, run in runs:
+            # Fresh gateway without a response cache, so the second run does not reuse the first
+            answerer = Answerer(directory, "mock-key", gateway=LlmGateway(api_key="mock-key", cache_dir=None))
+            requests, tokens = server.request_count, server.prompt_tokens
+            start = time.perf_counter()
+            run(answerer)
+            elapsed = time.perf_counter() - start
+            print(f"{label:<14} {elapsed:>8.2f} {server.request_count - requests:>9} {server.prompt_tokens - tokens:>14}")
+
+
+if __name__ == "__main__":
+    main()
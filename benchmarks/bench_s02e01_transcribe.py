@@ -0,0 +1,81 @@
+"""Files/min of s02e01.AudioTranscriber against the previous pydub + temporary WAV path.
+
+Without --directory a few synthetic .m4a clips are generated with ffmpeg.
+
+Usage: python benchmarks/bench_s02e01_transcribe.py [--directory DIR] [--workers 1 4]
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_clips(directory, count, seconds):
+    for i in range(count):
+        subprocess.run(
+            ["ffmpeg", "-nostdin", "-loglevel", "error", "-f", "lavfi",
+             "-i", f"sine=frequency={220 + 110 * i}:duration={seconds}", "-c:a", "aac",
+             os.path.join(directory, f"clip{i}.m4a")],
+            check=True,
+        )
+
+
+def previous_path(directory, model_name):
+    # The original AudioTranscriber: model loaded per instance, every m4a exported to WAV first
+    import whisper
+    from pydub import AudioSegment
+
+    model = whisper.load_model(model_name)
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith(".m4a"):
+            file_path = os.path.join(directory, filename)
+            wav_path = file_path.replace(".m4a", ".wav")
+            AudioSegment.from_file(file_path, format="m4a").export(wav_path, format="wav")
+            text = model.transcribe(wav_path)["text"]
+            with open(file_path.replace(".m4a", ".txt"), "w", encoding="utf-8") as text_file:
+                text_file.write(text)
+            os.remove(wav_path)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--directory")
+    parser.add_argument("--clips", type=int, default=6)
+    parser.add_argument("--seconds", type=int, default=30)
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    from s02e01 import AudioTranscriber
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.directory:
+            for filename in os.listdir(args.directory):
+                if filename.endswith(".m4a"):
+                    shutil.copy(os.path.join(args.directory, filename), directory)
+        else:
+            make_clips(directory, args.clips, args.seconds)
+        files = len([filename for filename in os.listdir(directory) if filename.endswith(".m4a")])
+
+        print(f"{files} clips, whisper model '{args.model}'")
+        print(f"{'path':<22} {'seconds':>8} {'files/min':>10}")
+        start = time.perf_counter()
+        previous_path(directory, args.model)
+        elapsed = time.perf_counter() - start
+        print(f"{'pydub + temp WAV':<22} {elapsed:>8.1f} {files * 60 / elapsed:>10.1f}")
+
+        for workers in args.workers:
+            transcriber = AudioTranscriber(directory, model_name=args.model, workers=workers)
+            start = time.perf_counter()
+            transcriber.convert_and_transcribe()
+            elapsed = time.perf_counter() - start
+            print(f"{'in-memory, ' + str(workers) + ' workers':<22} {elapsed:>8.1f} {files * 60 / elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Images/sec of s02e02.ImageRecognizer.recognize_images against a mock vision endpoint.
+
+Usage: python benchmarks/bench_s02e02_vision.py [--images 40] [--latency 0.5]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_openai import MockOpenAIServer
+
+
+def make_images(directory, count):
+    # Screenshot-sized images, so the preprocessing stage has something to shrink
+    from PIL import Image, ImageDraw
+
+    for i in range(count):
+        # Photo-like noise under drawn lines, roughly what map screenshots compress like
+        noise = Image.effect_noise((240, 135), 40 + i).resize((1920, 1080), Image.BILINEAR)
+        image = Image.merge("RGB", (noise, noise.rotate(180), Image.new("L", (1920, 1080), 128)))
+        draw = ImageDraw.Draw(image)
+        for line in range(0, 1920, 40):
+            draw.line([(line, 0), (1920 - line, 1080)], fill=(i * 7 % 255, 120, 200), width=3)
+        image.save(os.path.join(directory, f"{i}.png"))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+
+    with MockOpenAIServer(latency=args.latency) as server, tempfile.TemporaryDirectory() as directory:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        from s02e02 import ImageRecognizer
+
+        make_images(directory, args.images)
+        print(f"{args.images} images, {args.latency:.2f}s simulated latency per call")
+        print(f"{'concurrency':>11} {'seconds':>8} {'images/s':>9}")
+        for concurrency in args.concurrency:
+            recognizer = ImageRecognizer(
+                "mock-key", directory, concurrency=concurrency,
+                descriptions_file_path=os.path.join(directory, "descriptions.txt"),
+            )
+            start = time.perf_counter()
+            asyncio.run(recognizer.recognize_images())
+            elapsed = time.perf_counter() - start
+            print(f"{concurrency:>11} {elapsed:>8.2f} {args.images / elapsed:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
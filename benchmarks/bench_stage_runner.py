@@ -0,0 +1,88 @@
+"""Reruns of the s02e05 pipeline through modules.StageRunner against the mock API.
+
+The article, its media, the questions and the report endpoint are served by
+the mock. The first run points the report at a missing URL. The report
+stage fails and the finished stages keep their artifacts. The next runs fix
+the report URL, repeat a run with nothing changed, and then switch to a
+different questions file. Each rerun should redo only the stages after the
+change. The artifacts' file names also show that keys are only hashed from
+parameters, never from the API keys.
+
+Usage: python benchmarks/bench_stage_runner.py [--files 6] [--latency 0.3] [--verbose]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_openai import MockOpenAIServer
+from benchmarks.run_e2e import make_image
+
+
+def serve_article(server, files):
+    parts = ["<html><body><h1>Artykuł</h1>"]
+    for i in range(files):
+        parts.append(f"<p>Akapit {i}. " + "Profesor Maj prowadził badania nad podróżami w czasie. " * 40 + "</p>")
+        server.static[f"/media/figure{i}.png"] = ("image/png", make_image(None, i))
+        parts.append(f'<img src="media/figure{i}.png">')
+    parts.append("</body></html>")
+    server.static["/article.html"] = ("text/html; charset=utf-8", "".join(parts).encode("utf-8"))
+    for name, count in (("questions.txt", 5), ("questions2.txt", 7)):
+        questions = "\n".join(f"{i:02d}=Pytanie numer {i} z {name}?" for i in range(1, count + 1))
+        server.static[f"/{name}"] = ("text/plain", questions.encode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=6, help="images in the article")
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--verbose", action="store_true", help="show the pipeline's own output")
+    args = parser.parse_args()
+
+    with MockOpenAIServer(latency=args.latency) as server, tempfile.TemporaryDirectory() as workdir:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        serve_article(server, args.files)
+
+        from openai import OpenAI
+        from modules.LlmGateway import get_gateway
+        from modules.StageRunner import StageError
+        from s02e05 import build_pipeline
+
+        # No response cache, so a skipped stage is the only way to save a call
+        get_gateway(api_key="mock-key", cache_dir=None)
+        client = OpenAI(api_key="mock-key")
+        runs = [
+            ("cold, report URL broken", "/questions.txt", "/missing-report"),
+            ("report URL fixed", "/questions.txt", "/report"),
+            ("nothing changed", "/questions.txt", "/report"),
+            ("other questions", "/questions2.txt", "/report"),
+        ]
+        print(f"{'run':<24} {'seconds':>8} {'API calls':>10} {'reports':>8}  stages")
+        for name, questions, answer in runs:
+            runner = build_pipeline(client, "mock-key", "report-key", workdir, server.url("/article.html"),
+                                    server.url(questions), server.url(answer))
+            calls = sum(server.counts.values())
+            reports = len(server.reports)
+            output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+            start = time.perf_counter()
+            with output:
+                try:
+                    runner.run(["report"])
+                except StageError:
+                    pass
+            elapsed = time.perf_counter() - start
+            stages = ", ".join(f"{stage}={status}" for stage, status in runner.status.items())
+            print(f"{name:<24} {elapsed:>8.2f} {sum(server.counts.values()) - calls:>10} "
+                  f"{len(server.reports) - reports:>8}  {stages}")
+
+        artifacts = sorted(os.listdir(os.path.join(workdir, "temp", "stages")))
+        print(f"\n{len(artifacts)} artifacts: {', '.join(artifacts)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Cold-start time of every cli.py subcommand, measured with python -X importtime.
+
+Each run is a fresh interpreter started with --import-only, so it loads the
+subcommand's modules and exits before any network call. Wall time includes
+interpreter startup; import time is the sum of the top-level entries in the
+-X importtime log. The heaviest packages outside the repository are listed
+per subcommand, and plain "import s02e05" / "import s02e01" runs show what
+the scripts themselves cost.
+
+Usage: python benchmarks/bench_startup.py [--runs 5] [--top 5] [--commands index answer ...]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COMMANDS = {
+    "index": ["cli.py", "--import-only", "index"],
+    "answer": ["cli.py", "--import-only", "answer"],
+    "transcribe": ["cli.py", "--import-only", "transcribe"],
+    "report": ["cli.py", "--import-only", "report", "answers.json"],
+    "import s02e05": ["-c", "import s02e05"],
+    "import s02e01": ["-c", "import s02e01"],
+}
+# Repository modules; the heaviest column lists what they pull in rather than themselves
+LOCAL = ("cli", "s02e01", "s02e02", "s02e03", "s02e05", "modules")
+
+
+def parse_importtime(log):
+    """Returns {module: (self us, cumulative us, depth)} from an -X importtime log."""
+    modules = {}
+    for line in log.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return modules
+
+
+def run_once(args):
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=ROOT,
+                            capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed")
+    return wall, parse_importtime(result.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5, help="heaviest top-level imports to list")
+    parser.add_argument("--commands", nargs="+", default=list(COMMANDS), choices=list(COMMANDS))
+    args = parser.parse_args()
+
+    print(f"{args.runs} runs per command, {sys.executable}")
+    print(f"{'command':<15} {'wall ms':>8} {'imports ms':>11} {'modules':>8}  heaviest")
+    for command in args.commands:
+        walls, totals = [], []
+        try:
+            for _ in range(args.runs):
+                wall, modules = run_once(COMMANDS[command])
+                walls.append(wall)
+                totals.append(sum(cumulative for _, cumulative, depth in modules.values() if depth == 0))
+        except RuntimeError as e:
+            print(f"{command:<15} failed: {e}")
+            continue
+        heaviest = sorted(((cumulative, name) for name, (_, cumulative, _) in modules.items()
+                           if "." not in name and name not in LOCAL), reverse=True)[:args.top]
+        print(f"{command:<15} {statistics.median(walls) * 1000:>8.0f} {statistics.median(totals) / 1000:>11.0f} "
+              f"{len(modules):>8}  " + ", ".join(f"{name} {cumulative / 1000:.0f}" for cumulative, name in heaviest))
+
+
+if __name__ == "__main__":
+    main()
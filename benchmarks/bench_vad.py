@@ -0,0 +1,136 @@
+"""Audio seconds removed by modules.VoiceActivity and the end-to-end speedup of modules.Transcriber.
+
+Without --files, synthetic recordings are generated. They contain
+utterances of voiced, syllable-like tone bursts, separated by pauses of
+0.5-8 s with a low noise floor and the odd click, so the true speech spans
+are known. Transcription goes to a simulated Whisper backend. Its time per
+call is a fixed overhead plus a real-time factor times the audio length, the
+same way billing and inference scale.
+
+Usage: python benchmarks/bench_vad.py [--recordings 4] [--minutes 3] [--overhead 0.3] [--rtf 0.05] [--files a.wav ...]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.VoiceActivity import SAMPLE_RATE, VoiceActivityDetector, load_audio, write_wav
+
+
+class SimulatedWhisper:
+    name = "simulated"
+
+    def __init__(self, overhead, realtime_factor):
+        self.overhead = overhead
+        self.realtime_factor = realtime_factor
+        self.calls = 0
+        self.seconds = 0.0
+        self.lock = threading.Lock()
+
+    def transcribe(self, file_path, language="pl"):
+        with wave.open(file_path, "rb") as wav:
+            seconds = wav.getnframes() / wav.getframerate()
+        with self.lock:
+            self.calls += 1
+            self.seconds += seconds
+        time.sleep(self.overhead + seconds * self.realtime_factor)
+        return f"tekst ({seconds:.1f}s)"
+
+
+def make_recording(seconds, seed):
+    """Returns (samples, [(start, end)] of the true speech in samples)."""
+    rng = np.random.default_rng(seed)
+    samples = rng.normal(0, 10 ** (-60 / 20), int(seconds * SAMPLE_RATE)).astype(np.float32)
+    speech = []
+    position = int(rng.uniform(0.5, 3) * SAMPLE_RATE)
+    while position < len(samples) - SAMPLE_RATE:
+        start = cursor = position
+        end = min(len(samples), start + int(rng.uniform(1, 6) * SAMPLE_RATE))
+        f0 = rng.uniform(100, 220)
+        while cursor < end:
+            # One syllable: a few harmonics under a smooth envelope, then a short gap
+            length = min(int(rng.uniform(0.08, 0.25) * SAMPLE_RATE), end - cursor)
+            t = np.arange(length) / SAMPLE_RATE
+            tone = sum(np.sin(2 * np.pi * f0 * harmonic * t) / harmonic for harmonic in range(1, 5))
+            samples[cursor:cursor + length] += (0.2 * rng.uniform(0.3, 1) * np.hanning(length) * tone).astype(np.float32)
+            cursor += length + int(rng.uniform(0.05, 0.15) * SAMPLE_RATE)
+        speech.append((start, min(cursor, end)))
+        position = min(cursor, end) + int(rng.uniform(0.5, 8) * SAMPLE_RATE)
+        if rng.random() < 0.2:
+            # A click in the pause, too short to count as speech
+            samples[position - SAMPLE_RATE // 4:position - SAMPLE_RATE // 4 + 40] += 0.5
+    return samples, speech
+
+
+def coverage(segments, speech):
+    """Share of the true speech samples that fall inside the detected segments."""
+    total = sum(end - start for start, end in speech)
+    kept = sum(max(0, min(end, seg_end) - max(start, seg_start))
+               for start, end in speech for seg_start, seg_end in segments)
+    return kept / total if total else 1.0
+
+
+def transcribe_all(paths, vad, args):
+    from modules.Transcriber import Transcriber
+
+    backend = SimulatedWhisper(args.overhead, args.rtf)
+    transcriber = Transcriber(None, local_backend=backend, vad=vad, segment_seconds=args.segment_seconds,
+                              segment_workers=args.workers, timestamps=True)
+    start = time.perf_counter()
+    texts = [transcriber.transcribe(path) for path in paths]
+    return time.perf_counter() - start, backend, texts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recordings", type=int, default=4)
+    parser.add_argument("--minutes", type=float, default=3)
+    parser.add_argument("--files", nargs="+", help="real recordings instead of synthetic ones (non-WAV needs ffmpeg)")
+    parser.add_argument("--overhead", type=float, default=0.3, help="seconds per transcription call")
+    parser.add_argument("--rtf", type=float, default=0.05, help="seconds of work per second of audio")
+    parser.add_argument("--segment-seconds", type=float, default=30, help="longest chunk sent in one call")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths, truth = args.files or [], {}
+        if not paths:
+            for i in range(args.recordings):
+                samples, speech = make_recording(args.minutes * 60, seed=i)
+                paths.append(os.path.join(directory, f"recording{i}.wav"))
+                write_wav(paths[-1], samples)
+                truth[paths[-1]] = speech
+
+        vad = VoiceActivityDetector()
+        print(f"{'recording':<16} {'audio s':>8} {'true s':>7} {'kept s':>7} {'removed':>8} {'segments':>9} "
+              f"{'coverage':>9} {'vad ms':>7}")
+        for path in paths:
+            samples = load_audio(path)
+            start = time.perf_counter()
+            segments = vad.segments(samples)
+            elapsed = time.perf_counter() - start
+            kept = sum(end - begin for begin, end in segments) / SAMPLE_RATE
+            covered = f"{coverage(segments, truth[path]):.1%}" if path in truth else "-"
+            true_speech = f"{sum(end - begin for begin, end in truth[path]) / SAMPLE_RATE:.1f}" if path in truth else "-"
+            print(f"{os.path.basename(path)[:16]:<16} {len(samples) / SAMPLE_RATE:>8.1f} {true_speech:>7} {kept:>7.1f} "
+                  f"{1 - kept * SAMPLE_RATE / len(samples):>8.1%} {len(segments):>9} {covered:>9} {elapsed * 1000:>7.1f}")
+
+        print(f"\n{'transcription':<16} {'seconds':>8} {'calls':>6} {'audio sent s':>13} {'speedup':>8}")
+        baseline, backend, _ = transcribe_all(paths, None, args)
+        print(f"{'whole files':<16} {baseline:>8.2f} {backend.calls:>6} {backend.seconds:>13.1f} {1:>7.2f}x")
+        vad = VoiceActivityDetector()
+        elapsed, backend, texts = transcribe_all(paths, vad, args)
+        print(f"{'speech only':<16} {elapsed:>8.2f} {backend.calls:>6} {backend.seconds:>13.1f} {baseline / elapsed:>7.2f}x")
+        print(f"\n{vad.stats()}")
+        print("First lines:", " | ".join(texts[0].splitlines()[:3]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Build time, memory, query latency and recall@k of the KnowledgeDb index types on synthetic vectors.
+
+Vectors lie around random cluster centres along a low-dimensional subspace,
+like embeddings of many pages on a few topics; recall@k is measured against
+the exact flat index.
+
+Usage: python benchmarks/bench_vector_index.py [--vectors 100000] [--dim 256] [--queries 1000] [--k 10]
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import faiss
+import numpy as np
+
+from modules.VectorIndex import INDEX_TYPES, choose_index_type, make_index
+
+
+def make_vectors(count, dim, clusters=200, latent=16, seed=0):
+    # Centres and subspace are shared by every call, only the samples depend on seed
+    shared = np.random.default_rng(0)
+    centres = shared.normal(size=(clusters, dim))
+    projection = shared.normal(size=(latent, dim)) / np.sqrt(latent)
+    rng = np.random.default_rng(seed)
+    labels = rng.integers(0, clusters, size=count)
+    spread = 0.5 * rng.normal(size=(count, latent)) @ projection
+    return (centres[labels] + spread + 0.05 * rng.normal(size=(count, dim))).astype("float32")
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vectors", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--types", nargs="+", default=list(INDEX_TYPES), choices=list(INDEX_TYPES))
+    args = parser.parse_args()
+
+    threads = faiss.omp_get_max_threads()
+    vectors = make_vectors(args.vectors, args.dim)
+    queries = make_vectors(args.queries, args.dim, seed=1)
+
+    print(f"{args.vectors} vectors x {args.dim} dims, {args.queries} queries, k={args.k}, "
+          f"auto picks '{choose_index_type(args.vectors)}'")
+    print(f"{'index':<7} {'build s':>8} {'MiB':>8} {'p50 ms':>8} {'p95 ms':>8} {'batch q/s':>10} {'recall@k':>9}")
+    exact = None
+    for index_type in ["flat"] + [t for t in args.types if t != "flat"]:
+        faiss.omp_set_num_threads(threads)
+        start = time.perf_counter()
+        index = make_index(index_type, vectors)
+        index.add(vectors)
+        build = time.perf_counter() - start
+        # One thread for queries, so single-query latency is not dominated by thread start-up
+        faiss.omp_set_num_threads(1)
+        size = faiss.serialize_index(index).nbytes / 2 ** 20
+
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query[None, :], args.k)
+            latencies.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        _, found = index.search(queries, args.k)
+        batch = args.queries / (time.perf_counter() - start)
+
+        if exact is None:
+            exact = found
+        recall = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(found, exact)])
+        if index_type in args.types:
+            print(f"{index_type:<7} {build:>8.2f} {size:>8.1f} {percentile(latencies, 0.5) * 1000:>8.3f} "
+                  f"{percentile(latencies, 0.95) * 1000:>8.3f} {batch:>10.0f} {recall:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
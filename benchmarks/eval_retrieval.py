@@ -0,0 +1,194 @@
+"""Recall@k and per-query latency of FAISS-only, BM25-only and hybrid retrieval in s02e05.KnowledgeDb.
+
+The corpus is synthetic: every paragraph describes one researcher with a
+unique surname, street, year and topic. Questions either name the person
+(exact terms), repeat the topic words verbatim ("topic"), or describe the
+topic in other words ("paraphrase"), the case the vector half is for.
+Offline, embeddings are hashed character trigrams plus a fixed delay
+standing in for the API round-trip. Trigrams only see shared spelling, so
+paraphrase recall needs --openai, which uses the real embeddings endpoint.
+
+Usage: python benchmarks/eval_retrieval.py [--paragraphs 300] [--questions 200] [--k 4] [--embed-latency 0.2] [--openai]
+"""
+import argparse
+import hashlib
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.embeddings import Embeddings
+
+SYLLABLES = ["ko", "wal", "ski", "nie", "dzi", "mar", "sta", "lew", "gor", "bro", "zie", "rem", "pio", "tro", "wik"]
+STREETS = ["Długa", "Szeroka", "Ogrodowa", "Polna", "Leśna", "Kwiatowa", "Słoneczna", "Lipowa", "Brzozowa", "Kasztanowa"]
+ADJECTIVES = ["kwantowe", "morskie", "leśne", "miejskie", "kosmiczne", "górskie", "rzeczne", "polarne", "pustynne", "wulkaniczne"]
+NOUNS = ["algorytmy", "ekosystemy", "materiały", "roboty", "sieci", "kryształy", "bakterie", "chmury", "fale", "minerały"]
+QUALIFIERS = ["nocą", "zimą", "latem", "pod wodą", "w próżni", "w laboratorium", "na orbicie", "w terenie", "w mieście", "na wsi"]
+# The same topics in other words, index for index
+ADJECTIVE_PARAPHRASES = ["z mechaniki kwantów", "oceaniczne", "z puszczy", "wielkomiejskie", "pozaziemskie",
+                         "alpejskie", "z dorzecza", "arktyczne", "z Sahary", "spod stożków lawy"]
+NOUN_PARAPHRASES = ["procedury obliczeniowe", "środowiska przyrodnicze", "tworzywa", "automaty", "połączenia",
+                    "struktury krystaliczne", "drobnoustroje", "obłoki", "drgania", "skały i rudy"]
+QUALIFIER_PARAPHRASES = ["po zmroku", "w mroźne miesiące", "w wakacje", "w głębinach", "bez powietrza",
+                         "w pracowni", "w przestrzeni okołoziemskiej", "poza budynkiem", "w aglomeracji", "na prowincji"]
+
+
+class HashingEmbedding(Embeddings):
+    """Character-trigram feature hashing; lexical similarity only, but deterministic and offline."""
+
+    def __init__(self, size=512, latency=0.2):
+        self.size = size
+        self.latency = latency
+        self.calls = 0
+
+    def embed(self, text):
+        vector = [0.0] * self.size
+        text = f" {text.lower()} "
+        for i in range(len(text) - 2):
+            bucket = int.from_bytes(hashlib.blake2b(text[i:i + 3].encode("utf-8"), digest_size=4).digest(), "little")
+            vector[bucket % self.size] += 1.0
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        time.sleep(self.latency)
+        return [self.embed(text) for text in texts]
+
+    def embed_query(self, text):
+        self.calls += 1
+        time.sleep(self.latency)
+        return self.embed(text)
+
+
+class CountingEmbedding(Embeddings):
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text):
+        self.calls += 1
+        return self.embeddings.embed_query(text)
+
+
+def make_corpus(paragraphs, seed=0):
+    rng = random.Random(seed)
+    people = []
+    for i in range(paragraphs):
+        surname = "".join(rng.choice(SYLLABLES) for _ in range(3)).capitalize() + SYLLABLES[i % len(SYLLABLES)]
+        person = {
+            "surname": surname,
+            "street": f"{rng.choice(STREETS)} {rng.randint(1, 120)}",
+            "year": rng.randint(1950, 2023),
+            "topic": f"{ADJECTIVES[i % 10]} {NOUNS[(i // 10) % 10]} {QUALIFIERS[(i // 100) % 10]}",
+            "paraphrase": f"{ADJECTIVE_PARAPHRASES[i % 10]} {NOUN_PARAPHRASES[(i // 10) % 10]} "
+                          f"{QUALIFIER_PARAPHRASES[(i // 100) % 10]}",
+        }
+        person["text"] = (
+            f"Profesor {person['surname']} pracuje w instytucie przy ulicy {person['street']} od roku {person['year']}. "
+            f"Zajmuje się badaniami, których tematem są {person['topic']}. "
+            + " ".join(rng.choice(["Wydział", "prowadzi", "zajęcia", "ze", "studentami", "i", "publikuje", "wyniki"])
+                       for _ in range(25))
+        )
+        people.append(person)
+    return people
+
+
+def make_questions(people, count, seed=1):
+    rng = random.Random(seed)
+    questions = []
+    for _ in range(count):
+        person = rng.choice(people)
+        kind = rng.choice(["street", "year", "topic", "paraphrase"])
+        if kind == "street":
+            question = f"Przy jakiej ulicy pracuje profesor {person['surname']}?"
+        elif kind == "year":
+            question = f"Od którego roku pracuje profesor {person['surname']}?"
+        elif kind == "topic":
+            # No names or numbers, so this one always goes through the vector search
+            question = f"kto prowadzi badania, których tematem są {person['topic']}?"
+        else:
+            question = f"kto bada {person['paraphrase']}?"
+        questions.append((kind, question, person))
+    return questions
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def evaluate(label, retriever, questions, gold, embeddings):
+    calls = embeddings.calls
+    latencies, hits, by_kind = [], 0, {}
+    for kind, question, person in questions:
+        start = time.perf_counter()
+        documents = retriever.invoke(question)
+        latencies.append(time.perf_counter() - start)
+        found = any(gold[person["surname"]] == document.page_content for document in documents)
+        hits += found
+        kind_hits, kind_total = by_kind.get(kind, (0, 0))
+        by_kind[kind] = (kind_hits + found, kind_total + 1)
+    recall = {kind: kind_hits / total for kind, (kind_hits, total) in sorted(by_kind.items())}
+    print(f"{label:<24} {hits / len(questions):>7.2f} "
+          + " ".join(f"{recall[kind]:>10.2f}" for kind in ("street", "year", "topic", "paraphrase"))
+          + f" {percentile(latencies, 0.5) * 1000:>8.1f} {percentile(latencies, 0.95) * 1000:>8.1f} {embeddings.calls - calls:>11}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--paragraphs", type=int, default=300)
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--embed-latency", type=float, default=0.2)
+    parser.add_argument("--openai", action="store_true", help="use the real embeddings endpoint (OPENAI_API_KEY)")
+    args = parser.parse_args()
+
+    from s02e05 import KnowledgeDb
+    from modules.HybridRetriever import HybridRetriever
+
+    people = make_corpus(args.paragraphs)
+    questions = make_questions(people, args.questions)
+    text = "\n\n".join(person["text"] for person in people)
+
+    if args.openai:
+        from openai import OpenAI
+        from modules.EmbeddingService import EmbeddingService
+        embeddings = CountingEmbedding(EmbeddingService(OpenAI()))
+    else:
+        embeddings = HashingEmbedding(latency=args.embed_latency)
+    knowledge_db = KnowledgeDb("mock-key", embeddings=embeddings)
+    vectorstore = knowledge_db.build_vectorstore(text)
+
+    # The chunk holding the person's first sentence is the one that answers every question about them
+    gold = {}
+    for chunk in knowledge_db.chunks.values():
+        for person in people:
+            if f"Profesor {person['surname']} " in chunk and person["surname"] not in gold:
+                gold[person["surname"]] = chunk
+
+    print(f"{len(knowledge_db.chunks)} chunks, {len(questions)} questions, k={args.k}, "
+          f"{'OpenAI' if args.openai else f'hashed trigram ({args.embed_latency:.2f}s per call)'} embeddings")
+    print(f"{'retriever':<24} {'recall':>7} {'street':>10} {'year':>10} {'topic':>10} {'paraphrase':>10} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'embed calls':>11}")
+    retrievers = [
+        ("FAISS only", vectorstore.as_retriever(search_kwargs={"k": args.k})),
+        ("BM25 only", HybridRetriever.from_chunks(vectorstore, knowledge_db.chunks, k=args.k, vector_search=False)),
+        ("hybrid RRF", HybridRetriever.from_chunks(vectorstore, knowledge_db.chunks, k=args.k, keyword_shortcut=False)),
+        ("hybrid RRF + shortcut", HybridRetriever.from_chunks(vectorstore, knowledge_db.chunks, k=args.k)),
+        ("shortcut + margin 1.1", HybridRetriever.from_chunks(vectorstore, knowledge_db.chunks, k=args.k,
+                                                              keyword_margin=1.1)),
+    ]
+    for label, retriever in retrievers:
+        evaluate(label, retriever, questions, gold, embeddings)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockOpenAIServer:
+    """Local stand-in for the OpenAI API and the report endpoint that answers after an artificial delay.
+
+    Handles chat completions (text, vision and json_schema), embeddings,
+    audio transcriptions, image generations and POST /report, and serves the
+    files in static on GET. error_rate makes that share of API calls fail
+    with error_status, after the same delay.
+    """
+
+    def __init__(self, latency=0.5, host="127.0.0.1", port=0, echo=False, error_rate=0.0, error_status=500,
+                 embedding_dim=1536, seed=0):
+        self.latency = latency
+        # echo: answer with the last user message, cut to roughly max_tokens, instead of a fixed text
+        self.echo = echo
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.embedding_dim = embedding_dim
+        self.random = random.Random(seed)
+        self.request_count = 0
+        self.error_count = 0
+        # Requests per endpoint, e.g. {"chat/completions": 12, "embeddings": 3}
+        self.counts = {}
+        self.prompt_tokens = 0
+        # JSON bodies received on POST /report
+        self.reports = []
+        # Plain files served on GET, e.g. {"/questions.txt": ("text/plain", b"01=...")}
+        self.static = {}
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def url(self, path):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}{path}"
+
+    @staticmethod
+    def sample(schema):
+        # Smallest value that satisfies a JSON schema made of objects, arrays and strings
+        if schema.get("type") == "object":
+            return {name: MockOpenAIServer.sample(value) for name, value in schema.get("properties", {}).items()}
+        if schema.get("type") == "array":
+            return []
+        return "mock"
+
+    def begin(self, endpoint):
+        """Counts the call, waits out the latency and says whether to fail it."""
+        with self.lock:
+            self.request_count += 1
+            self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+            failed = self.random.random() < self.error_rate
+            self.error_count += failed
+        time.sleep(self.latency)
+        return failed
+
+    def chat_completion(self, payload):
+        # About four characters per token, enough to compare prompt sizes between runs
+        text = [m.get("content") for m in payload.get("messages", []) if isinstance(m.get("content"), str)]
+        prompt_tokens = sum(len(t) for t in text) // 4 + 1
+        with self.lock:
+            self.prompt_tokens += prompt_tokens
+        content = "mock description"
+        response_format = payload.get("response_format") or {}
+        if response_format.get("type") == "json_schema":
+            content = json.dumps(self.sample(response_format["json_schema"]["schema"]))
+        elif self.echo:
+            user_messages = [m.get("content") for m in payload.get("messages", []) if m.get("role") == "user"]
+            content = user_messages[-1] if user_messages and isinstance(user_messages[-1], str) else ""
+            if payload.get("max_tokens"):
+                content = content[:payload["max_tokens"] * 4]
+        return {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "mock"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 10, "total_tokens": prompt_tokens + 10},
+        }
+
+    def embedding(self, text):
+        # Same text, same vector, so retrieval results are stable between runs
+        generator = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+        return [generator.uniform(-1, 1) for _ in range(self.embedding_dim)]
+
+    def embeddings(self, payload):
+        inputs = payload.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        tokens = sum(len(text) // 4 + 1 for text in inputs if isinstance(text, str))
+        return {
+            "object": "list",
+            "model": payload.get("model", "mock"),
+            "data": [
+                {"object": "embedding", "index": i, "embedding": self.embedding(text if isinstance(text, str) else json.dumps(text))}
+                for i, text in enumerate(inputs)
+            ],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    def image_generation(self, payload):
+        return {"created": int(time.time()), "data": [{"url": self.url("/generated.png"), "revised_prompt": payload.get("prompt", "")}]}
+
+    def report(self, payload):
+        with self.lock:
+            self.reports.append(payload)
+        return {"code": 0, "message": "OK"}
+
+    def _handler_class(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path not in mock.static:
+                    self._send_json({"error": {"message": f"Unknown path {self.path}"}}, status=404)
+                    return
+                content_type, body = mock.static[self.path]
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length)
+                path = self.path.split("?")[0].rstrip("/")
+                routes = {
+                    "/v1/chat/completions": mock.chat_completion,
+                    "/v1/embeddings": mock.embeddings,
+                    "/v1/images/generations": mock.image_generation,
+                    # Multipart upload, only the size of the body matters here
+                    "/v1/audio/transcriptions": lambda payload: {"text": "mock transcription"},
+                    "/report": mock.report,
+                }
+                if path not in routes:
+                    self._send_json({"error": {"message": f"Unknown path {self.path}"}}, status=404)
+                    return
+                if mock.begin(path.replace("/v1/", "", 1).lstrip("/")):
+                    self._send_json({"error": {"message": "Injected failure", "type": "server_error"}}, status=mock.error_status)
+                    return
+                is_json = self.headers.get("Content-Type", "").startswith("application/json")
+                payload = json.loads(body or b"{}") if is_json else {}
+                self._send_json(routes[path](payload))
+
+            def _send_json(self, body, status=200):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,184 @@
+"""End-to-end runs of s02e01, s02e02, s02e03 and s02e05 against the local mock server.
+
+Every iteration starts from an empty working directory, so the media,
+embedding and response caches are cold. Peak memory comes from one extra
+tracemalloc run per scenario, kept apart from the timed ones.
+
+Usage: python benchmarks/run_e2e.py [--iterations 5] [--latency 0.2] [--error-rate 0.0] [--scenarios s02e05 ...]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.mock_openai import MockOpenAIServer
+
+QUESTION = "Write the name of the street, where the institute is located, where the professor teaches."
+
+
+def make_image(path, seed):
+    from PIL import Image, ImageDraw
+
+    image = Image.effect_noise((160, 90), 30 + seed).resize((1280, 720)).convert("RGB")
+    draw = ImageDraw.Draw(image)
+    for line in range(0, 1280, 64):
+        draw.line([(line, 0), (1280 - line, 720)], fill=(seed * 37 % 255, 90, 180), width=3)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    if path:
+        with open(path, "wb") as file:
+            file.write(buffer.getvalue())
+    return buffer.getvalue()
+
+
+def prepare_s02e01(server, args):
+    from s02e01 import Answerer, ReportSender
+    from modules.LlmGateway import LlmGateway
+
+    def run(workdir):
+        for i in range(args.files):
+            with open(os.path.join(workdir, f"{i}.txt"), "w", encoding="utf-8") as file:
+                file.write(f"Przesłuchanie {i}. " + "Profesor wykładał na uczelni przy ulicy. " * 200)
+        answerer = Answerer(workdir, "mock-key", gateway=LlmGateway(api_key="mock-key", cache_dir=None))
+        answer = asyncio.run(answerer.run_pipeline(QUESTION))
+        ReportSender("report-key", server.url("/report")).send_report(answer)
+
+    return run
+
+
+def prepare_s02e02(server, args):
+    from s02e02 import Answerer, ImageRecognizer
+    from modules.LlmGateway import LlmGateway
+
+    def run(workdir):
+        for i in range(args.files):
+            make_image(os.path.join(workdir, f"{i}.png"), i)
+        descriptions = os.path.join(workdir, "descriptions.txt")
+        recognizer = ImageRecognizer("mock-key", workdir, descriptions_file_path=descriptions)
+        asyncio.run(recognizer.recognize_images())
+        with open(descriptions, "r") as text_file:
+            image_descriptions = text_file.read()
+        answerer = Answerer(workdir, "mock-key", gateway=LlmGateway(api_key="mock-key", cache_dir=None))
+        asyncio.run(answerer.answer_question(image_descriptions, "What city is on the images?"))
+
+    return run
+
+
+def prepare_s02e03(server, args):
+    import s02e03
+
+    server.static["/robotid.json"] = ("application/json", json.dumps({"description": "Robot z gąsienicami"}).encode("utf-8"))
+
+    def run(workdir):
+        s02e03.main(prompt_url=server.url("/robotid.json"), report_url=server.url("/report"))
+
+    return run
+
+
+def prepare_s02e05(server, args):
+    from openai import OpenAI
+    from s02e05 import IndexHtml, KnowledgeDb, SimpleAnswerer
+    from modules.LlmGateway import LlmGateway
+    from modules.Responder import ReportSenderAnswerJson
+
+    parts = ["<html><body><h1>Artykuł</h1>"]
+    for i in range(args.files):
+        parts.append(f"<p>Akapit {i}. " + "Profesor Maj prowadził badania nad podróżami w czasie. " * 40 + "</p>")
+        server.static[f"/media/figure{i}.png"] = ("image/png", make_image(None, i))
+        parts.append(f'<img src="media/figure{i}.png">')
+    server.static["/media/recording.mp3"] = ("audio/mpeg", b"ID3" + bytes(256 * 1024))
+    parts.append('<audio controls><source src="media/recording.mp3" type="audio/mpeg"></audio></body></html>')
+    server.static["/article.html"] = ("text/html; charset=utf-8", "".join(parts).encode("utf-8"))
+    questions = "\n".join(f"{i:02d}=Pytanie numer {i}?" for i in range(1, 6))
+    server.static["/questions.txt"] = ("text/plain", questions.encode("utf-8"))
+
+    def run(workdir):
+        client = OpenAI(api_key="mock-key")
+        text = IndexHtml(client).index_webpage(server.url("/article.html"), workdir)
+        KnowledgeDb("mock-key", index_dir=os.path.join(workdir, "index")).build_vectorstore(text)
+        answerer = SimpleAnswerer(server.url("/questions.txt"), client, text,
+                                  gateway=LlmGateway(sync_client=client, cache_dir=None))
+        answers = answerer.generate_answers_concurrently()
+        ReportSenderAnswerJson("report-key", "arxiv", server.url("/report")).send_report(answers)
+
+    return run
+
+
+SCENARIOS = {
+    "s02e01": prepare_s02e01,
+    "s02e02": prepare_s02e02,
+    "s02e03": prepare_s02e03,
+    "s02e05": prepare_s02e05,
+}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def run_once(run, verbose):
+    with tempfile.TemporaryDirectory() as workdir:
+        output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+        with output:
+            start = time.perf_counter()
+            run(workdir)
+            return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--files", type=int, default=4, help="transcripts, images or article sections per run")
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--verbose", action="store_true", help="show the scripts' own output")
+    args = parser.parse_args()
+
+    with MockOpenAIServer(latency=args.latency, error_rate=args.error_rate) as server, \
+            tempfile.TemporaryDirectory() as home:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "mock-key")
+        # Relative paths (e.g. the default LLM cache) land in a scratch directory
+        previous_dir = os.getcwd()
+        os.chdir(home)
+        from modules.LlmGateway import get_gateway
+        get_gateway(api_key="mock-key", cache_dir=None)
+
+        print(f"{args.iterations} iterations, {args.latency:.2f}s simulated latency, {args.error_rate:.0%} injected errors")
+        print(f"{'scenario':<9} {'runs/s':>7} {'p50 s':>7} {'p95 s':>7} {'peak MiB':>9} {'API calls':>10} {'errors':>7} {'reports':>8}")
+        try:
+            for name in args.scenarios:
+                try:
+                    run = SCENARIOS[name](server, args)
+                except ImportError as e:
+                    print(f"{name:<9} skipped: {e}")
+                    continue
+                calls, errors, reports = server.request_count, server.error_count, len(server.reports)
+                timings = [run_once(run, args.verbose) for _ in range(args.iterations)]
+                calls, errors, reports = server.request_count - calls, server.error_count - errors, len(server.reports) - reports
+
+                tracemalloc.start()
+                run_once(run, args.verbose)
+                peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+                tracemalloc.stop()
+
+                print(f"{name:<9} {len(timings) / sum(timings):>7.2f} {percentile(timings, 0.5):>7.2f} "
+                      f"{percentile(timings, 0.95):>7.2f} {peak:>9.1f} {calls:>10} {errors:>7} {reports:>8}")
+        finally:
+            os.chdir(previous_dir)
+
+
+if __name__ == "__main__":
+    main()
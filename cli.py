@@ -0,0 +1,169 @@
+"""Command line entry point for the s02e01 and s02e05 pipelines.
+
+    python cli.py index      [--url URL_ARTICLE] [--dir DIR] [--crawl-depth 2 --max-pages 50]
+    python cli.py answer     [--questions URL_QUESTION] [--context DIR/temp/context.txt] [--output answers.json]
+    python cli.py transcribe [--dir DIR] [--workers N] [--no-vad]
+    python cli.py report     answers.json [--task arxiv] [--url URL_ANSWER]
+    python cli.py pipeline   [--stages report] [--force answers,report] [--dir DIR]
+
+Defaults come from the environment (and a .env file). Each subcommand imports
+only what it uses; --import-only stops right after those imports, which is
+what benchmarks/bench_startup.py times.
+"""
+import argparse
+import json
+import os
+import sys
+
+
+def context_path(directory):
+    # index_webpage writes the page text next to the media it downloaded
+    return os.path.join(directory or ".", "temp", "context.txt")
+
+
+def run_index(args):
+    from openai import OpenAI
+    from s02e05 import IndexHtml, KnowledgeDb, SiteCrawler
+    from modules.Tracing import get_tracer
+    if args.import_only:
+        return
+
+    client = OpenAI(api_key=args.openai_api_key)
+    if args.crawl_depth:
+        # Same-origin links up to crawl_depth clicks away, merged into one context
+        crawler = SiteCrawler(IndexHtml(client), max_depth=args.crawl_depth, max_pages=args.max_pages)
+        text_content = crawler.crawl_site(args.url, args.dir)["context"]
+    else:
+        text_content = IndexHtml(client).index_webpage(args.url, args.dir)
+    print(f"Saved {len(text_content)} characters to {context_path(args.dir)}")
+    if not args.no_vectorstore:
+        knowledge_db = KnowledgeDb(args.openai_api_key, index_dir=os.path.join(args.dir, "temp", "index"),
+                                   index_type=args.index_type)
+        knowledge_db.build_vectorstore(text_content)
+    get_tracer().print_summary()
+
+
+def run_answer(args):
+    from openai import OpenAI
+    from s02e05 import SimpleAnswerer
+    from modules.LlmGateway import get_gateway
+    from modules.Tracing import get_tracer
+    if args.import_only:
+        return
+
+    with open(args.context or context_path(args.dir), "r", encoding="utf-8") as file:
+        context = file.read()
+    client = OpenAI(api_key=args.openai_api_key)
+    gateway = get_gateway(sync_client=client, cache_dir=os.path.join(args.dir, "temp"))
+    simple_answerer = SimpleAnswerer(args.questions, client, context, gateway=gateway)
+    answers = simple_answerer.generate_answers_concurrently(max_concurrency=args.concurrency)
+    print(json.dumps(answers, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(answers, file, ensure_ascii=False, indent=2)
+    simple_answerer.report_usage()
+    simple_answerer.gateway.report()
+    get_tracer().print_summary()
+
+
+def run_transcribe(args):
+    from s02e01 import AudioTranscriber
+    from modules.Tracing import get_tracer
+    if args.import_only:
+        return
+
+    AudioTranscriber(args.dir, model_name=args.model, workers=args.workers, vad=not args.no_vad).convert_and_transcribe()
+    get_tracer().print_summary()
+
+
+def run_report(args):
+    from modules.Responder import ReportSenderAnswerJson
+    if args.import_only:
+        return
+
+    with open(args.answers, "r", encoding="utf-8") as file:
+        answers = json.load(file)
+    ReportSenderAnswerJson(args.report_api_key, args.task, args.url).send_report(answers)
+
+
+def run_pipeline(args):
+    from openai import OpenAI
+    from s02e05 import build_pipeline
+    from modules.LlmGateway import get_gateway
+    from modules.StageRunner import StageError
+    from modules.Tracing import get_tracer
+    if args.import_only:
+        return
+
+    # Stages whose artifacts in DIR/temp/stages still match are loaded instead of rerun
+    runner = build_pipeline(OpenAI(api_key=args.openai_api_key), args.openai_api_key, args.report_api_key,
+                            args.dir, args.url, args.questions, args.answer_url)
+    try:
+        runner.run(args.stages.split(","), force=[name for name in args.force.split(",") if name])
+    except (StageError, ValueError) as e:
+        print(f"Pipeline stopped: {e}")
+        return 1
+    finally:
+        get_gateway().report()
+        get_tracer().print_summary()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--import-only", action="store_true", help="load the subcommand's modules and exit")
+    parser.add_argument("--openai-api-key", default=os.getenv("OPENAI_API_KEY"))
+    parser.add_argument("--report-api-key", default=os.getenv("REPORT_API_KEY"))
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    index = subcommands.add_parser("index", help="download the article with its media and build the FAISS index")
+    index.add_argument("--url", default=os.getenv("URL_ARTICLE"))
+    index.add_argument("--dir", default=os.getenv("DIR", "."))
+    index.add_argument("--index-type", default="auto", choices=["auto", "flat", "ivf", "hnsw", "ivfpq"])
+    index.add_argument("--no-vectorstore", action="store_true", help="only write context.txt")
+    index.add_argument("--crawl-depth", type=int, default=0, help="also follow same-origin links this many levels deep")
+    index.add_argument("--max-pages", type=int, default=50, help="page budget when crawling")
+    index.set_defaults(handler=run_index)
+
+    answer = subcommands.add_parser("answer", help="answer the questions from the saved article text")
+    answer.add_argument("--questions", default=os.getenv("URL_QUESTION"))
+    answer.add_argument("--dir", default=os.getenv("DIR", "."))
+    answer.add_argument("--context", help="text file with the article, defaults to DIR/temp/context.txt")
+    answer.add_argument("--concurrency", type=int, default=8)
+    answer.add_argument("--output", help="also write the answers to this JSON file")
+    answer.set_defaults(handler=run_answer)
+
+    transcribe = subcommands.add_parser("transcribe", help="transcribe the .m4a recordings in a directory with Whisper")
+    transcribe.add_argument("--dir", default=os.getenv("DIR", "."))
+    transcribe.add_argument("--model", default="base")
+    transcribe.add_argument("--workers", type=int)
+    transcribe.add_argument("--no-vad", action="store_true", help="send whole recordings, silence included")
+    transcribe.set_defaults(handler=run_transcribe)
+
+    report = subcommands.add_parser("report", help="send a JSON file of answers to the report API")
+    report.add_argument("answers", help="JSON file written by 'answer --output'")
+    report.add_argument("--task", default="arxiv")
+    report.add_argument("--url", default=os.getenv("URL_ANSWER"))
+    report.set_defaults(handler=run_report)
+
+    pipeline = subcommands.add_parser("pipeline", help="index, answer and report as stages that are skipped when done")
+    pipeline.add_argument("--url", default=os.getenv("URL_ARTICLE"))
+    pipeline.add_argument("--questions", default=os.getenv("URL_QUESTION"))
+    pipeline.add_argument("--answer-url", default=os.getenv("URL_ANSWER"))
+    pipeline.add_argument("--dir", default=os.getenv("DIR", "."))
+    pipeline.add_argument("--stages", default="report",
+                          help="comma-separated targets: context, questions, knowledge_base, answers, report")
+    pipeline.add_argument("--force", default="", help="comma-separated stages to rerun even if their artifact exists")
+    pipeline.set_defaults(handler=run_pipeline)
+    return parser
+
+
+def main(argv=None):
+    # dotenv is cheap, so the environment is ready before the defaults are read
+    from dotenv import load_dotenv
+    load_dotenv()
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
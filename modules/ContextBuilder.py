@@ -0,0 +1,73 @@
+import asyncio
+
+from modules.TokenCounter import count_tokens, split_by_tokens
+
+
+class ContextBuilder:
+    """Map-reduce over texts too large for a single chat completion.
+
+    Inputs are packed into groups of at most window_tokens tokens, every group
+    goes through the model concurrently (map), and the partial results are
+    merged. Without a reduce_prompt the merge is a plain join, so nothing is
+    summarised away; with one, partial results are combined by the model
+    group by group until a single text remains.
+    """
+
+    def __init__(self, gateway, system_prompt, model="gpt-4o", window_tokens=3000, max_tokens=4000,
+                 concurrency=4, reduce_prompt=None, separator="\n\n"):
+        # LlmGateway; temperature 0 lets it cache groups that did not change since the last run
+        self.gateway = gateway
+        self.system_prompt = system_prompt
+        self.model = model
+        # Input budget per request; keep it below max_tokens when the output repeats the input
+        self.window_tokens = window_tokens
+        self.max_tokens = max_tokens
+        self.concurrency = concurrency
+        self.reduce_prompt = reduce_prompt
+        self.separator = separator
+        self.stats = {"inputs": 0, "groups": 0, "requests": 0, "reduce_rounds": 0}
+
+    def make_groups(self, texts):
+        groups = []
+        group = []
+        group_tokens = 0
+        for text in texts:
+            for piece in split_by_tokens(text, self.window_tokens):
+                tokens = count_tokens(piece)
+                if group and group_tokens + tokens > self.window_tokens:
+                    groups.append(group)
+                    group = []
+                    group_tokens = 0
+                group.append(piece)
+                group_tokens += tokens
+        if group:
+            groups.append(group)
+        return groups
+
+    async def complete(self, system_prompt, content, semaphore):
+        async with semaphore:
+            text = await self.gateway.acomplete(system_prompt, content, model=self.model,
+                                                max_tokens=self.max_tokens, temperature=0)
+        self.stats["requests"] += 1
+        return text
+
+    async def process_groups(self, system_prompt, groups, semaphore):
+        return await asyncio.gather(
+            *(self.complete(system_prompt, self.separator.join(group), semaphore) for group in groups)
+        )
+
+    async def build(self, texts):
+        semaphore = asyncio.Semaphore(max(1, self.concurrency))
+        groups = self.make_groups(texts)
+        self.stats["inputs"] += len(texts)
+        self.stats["groups"] += len(groups)
+        outputs = await self.process_groups(self.system_prompt, groups, semaphore)
+
+        while self.reduce_prompt and len(outputs) > 1:
+            groups = self.make_groups(outputs)
+            if len(groups) == len(outputs):
+                # Partial results are too large to combine further, join them as they are
+                break
+            self.stats["reduce_rounds"] += 1
+            outputs = await self.process_groups(self.reduce_prompt, groups, semaphore)
+        return self.separator.join(outputs)
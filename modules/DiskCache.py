@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from modules.Tracing import record
+
+
+class DiskCache:
+    """Single-file SQLite cache with size-bounded LRU eviction and hit/miss counters.
+
+    Entries are keyed by content (see make_key), so renamed or re-downloaded
+    files hit the same entry and a changed model or prompt misses. The cache
+    also remembers HTTP validators (ETag/Last-Modified) per downloaded URL.
+    """
+
+    FILE_NAME = "media_cache.sqlite"
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                accessed REAL NOT NULL,
+                created REAL NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+            CREATE TABLE IF NOT EXISTS http_validators (
+                url TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                digest TEXT
+            );
+            """
+        )
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(entries)")}
+        if "created" not in columns:
+            # Caches written before entries could expire count as created at epoch
+            self.connection.execute("ALTER TABLE entries ADD COLUMN created REAL NOT NULL DEFAULT 0")
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(http_validators)")}
+        if "digest" not in columns:
+            # Validators stored without a digest never match a file, so those URLs are downloaded again
+            self.connection.execute("ALTER TABLE http_validators ADD COLUMN digest TEXT")
+        self.connection.commit()
+
+    @classmethod
+    def open(cls, directory, max_bytes=256 * 1024 * 1024, file_name=None):
+        # One shared instance per cache file, so counters cover the whole run
+        path = os.path.abspath(os.path.join(directory, file_name or cls.FILE_NAME))
+        with cls._instances_lock:
+            if path not in cls._instances:
+                cls._instances[path] = cls(path, max_bytes)
+            return cls._instances[path]
+
+    @staticmethod
+    def file_digest(path, chunk_size=1024 * 1024):
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def make_key(*parts):
+        return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def get(self, key, max_age=None):
+        # max_age: seconds after which an entry counts as missing and is dropped
+        with self.lock:
+            row = self.connection.execute("SELECT value, created FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None and max_age is not None and time.time() - row[1] > max_age:
+                self.connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self.connection.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                record(cache_misses=1)
+                return None
+            self.hits += 1
+            record(cache_hits=1)
+            self.connection.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+            self.connection.commit()
+            return row[0]
+
+    def put(self, key, value):
+        size = len(value.encode("utf-8"))
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, accessed, created) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, time.time(), time.time()),
+            )
+            self._evict()
+            self.connection.commit()
+
+    def _evict(self):
+        total = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used entries until the cache fits again
+        for key, size in self.connection.execute("SELECT key, size FROM entries ORDER BY accessed").fetchall():
+            if total <= self.max_bytes:
+                break
+            self.connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+
+    def get_validators(self, url):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT path, etag, last_modified, digest FROM http_validators WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"path": row[0], "etag": row[1], "last_modified": row[2], "digest": row[3]}
+
+    def set_validators(self, url, path, etag=None, last_modified=None, digest=None):
+        # digest: sha256 of the file as downloaded, checked before a 304 is trusted
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO http_validators (url, path, etag, last_modified, digest) VALUES (?, ?, ?, ?, ?)",
+                (url, path, etag, last_modified, digest),
+            )
+            self.connection.commit()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,138 @@
+import contextvars
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from modules.TokenCounter import count_tokens
+from modules.Tracing import record_usage
+
+
+class EmbeddingStore:
+    """Vectors kept as one float32 matrix on disk, addressed by chunk hash."""
+
+    def __init__(self, directory=None, model="default"):
+        self.directory = directory
+        self.rows = {}
+        self.vectors = None
+        self.pending = {}
+        self.lock = threading.Lock()
+        if directory:
+            self.vectors_path = os.path.join(directory, f"{model}.npy")
+            self.keys_path = os.path.join(directory, f"{model}.keys.json")
+            if os.path.exists(self.vectors_path) and os.path.exists(self.keys_path):
+                with open(self.keys_path, "r", encoding="utf-8") as file:
+                    keys = json.load(file)
+                self.vectors = np.load(self.vectors_path, mmap_mode="r")
+                self.rows = {key: row for row, key in enumerate(keys)}
+
+    def __len__(self):
+        return len(self.rows) + len(self.pending)
+
+    def get(self, key):
+        with self.lock:
+            row = self.rows.get(key)
+            if row is not None:
+                return self.vectors[row]
+            return self.pending.get(key)
+
+    def add(self, keys, vectors):
+        with self.lock:
+            for key, vector in zip(keys, vectors):
+                if key not in self.rows and key not in self.pending:
+                    self.pending[key] = np.asarray(vector, dtype=np.float32)
+
+    def save(self):
+        with self.lock:
+            if not self.pending:
+                return
+            pending = np.vstack(list(self.pending.values()))
+            vectors = pending if self.vectors is None else np.vstack([self.vectors, pending])
+            keys = sorted(self.rows, key=self.rows.get) + list(self.pending)
+            # Drop the memory map before replacing its file (required on Windows)
+            self.vectors = vectors
+            if self.directory:
+                os.makedirs(self.directory, exist_ok=True)
+                # Write next to the target and rename, so a crash never leaves half a matrix
+                with open(self.vectors_path + ".tmp", "wb") as file:
+                    np.save(file, vectors)
+                with open(self.keys_path + ".tmp", "w", encoding="utf-8") as file:
+                    json.dump(keys, file)
+                os.replace(self.vectors_path + ".tmp", self.vectors_path)
+                os.replace(self.keys_path + ".tmp", self.keys_path)
+            self.rows = {key: row for row, key in enumerate(keys)}
+            self.pending = {}
+
+
+class EmbeddingService(Embeddings):
+    """Embeds texts in token-bounded batches, concurrently, reusing cached vectors."""
+
+    def __init__(self, client, model="text-embedding-ada-002", cache_dir=None, max_batch_inputs=2048,
+                 max_batch_tokens=300000, concurrency=4):
+        self.client = client
+        self.model = model
+        self.store = EmbeddingStore(cache_dir, model)
+        self.max_batch_inputs = max_batch_inputs
+        self.max_batch_tokens = max_batch_tokens
+        self.concurrency = concurrency
+        self.stats = {"requested": 0, "cached": 0, "duplicates": 0, "embedded": 0, "api_calls": 0}
+
+    def key(self, text):
+        return hashlib.sha256(f"{self.model}\n{text}".encode("utf-8")).hexdigest()
+
+    def make_batches(self, texts):
+        batches = []
+        batch = []
+        batch_tokens = 0
+        for text in texts:
+            tokens = count_tokens(text)
+            if batch and (len(batch) >= self.max_batch_inputs or batch_tokens + tokens > self.max_batch_tokens):
+                batches.append(batch)
+                batch = []
+                batch_tokens = 0
+            batch.append(text)
+            batch_tokens += tokens
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def embed_batch(self, batch):
+        response = self.client.embeddings.create(model=self.model, input=batch)
+        record_usage(response)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    def embed_documents(self, texts):
+        keys = [self.key(text) for text in texts]
+        self.stats["requested"] += len(texts)
+
+        # Only unique texts without a cached vector go to the API
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key in missing:
+                self.stats["duplicates"] += 1
+            elif self.store.get(key) is not None:
+                self.stats["cached"] += 1
+            else:
+                missing[key] = text
+
+        if missing:
+            batches = self.make_batches(list(missing.values()))
+            with ThreadPoolExecutor(max_workers=max(1, self.concurrency)) as pool:
+                # Each batch runs in a copy of the caller's context, so its tokens land in the caller's span
+                futures = [pool.submit(contextvars.copy_context().run, self.embed_batch, batch) for batch in batches]
+                results = [future.result() for future in futures]
+            vectors = [vector for batch_vectors in results for vector in batch_vectors]
+            self.store.add(list(missing), vectors)
+            self.store.save()
+            self.stats["embedded"] += len(missing)
+            self.stats["api_calls"] += len(batches)
+
+        return [self.store.get(key).tolist() for key in keys]
+
+    def embed_query(self, text):
+        # Queries change every time, so they skip the store
+        return self.embed_batch([text])[0]
@@ -0,0 +1,176 @@
+import json
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from modules.Tracing import record
+
+
+class DownloadTooLarge(requests.RequestException):
+    pass
+
+
+def headers_without_range(headers):
+    return {name: value for name, value in headers.items() if name.lower() not in ("range", "if-range")}
+
+
+def read_part_state(part_path):
+    # Validators and total size of the response a .part file was started from
+    try:
+        with open(part_path + ".json", "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def write_part_state(part_path, response):
+    state = {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "size": response.headers.get("Content-Length"),
+    }
+    with open(part_path + ".json", "w", encoding="utf-8") as file:
+        json.dump(state, file)
+
+
+def part_validator(state):
+    # If-Range needs a strong ETag or a date; without one a .part cannot be resumed safely
+    if not state or not state.get("size"):
+        return None
+    etag = state.get("etag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return state.get("last_modified")
+
+
+def remove_part(part_path):
+    for path in (part_path, part_path + ".json"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class HttpClient:
+    """Shared requests session: keep-alive pooling, default timeouts, retries on 429/5xx.
+
+    Only idempotent methods are retried on 5xx and read errors. A POST may
+    already have been processed when those happen, so post() retries only
+    failed connects and 429/503 answers carrying Retry-After, which the
+    server sends before doing anything with the request.
+    """
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, timeout=(5, 60), retries=3, backoff_factor=0.5, pool_maxsize=16):
+        # timeout: (connect, read) seconds applied when a call does not pass its own
+        self.timeout = timeout
+        self.session = self.make_session(pool_maxsize, Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=self.RETRY_STATUSES,
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+            respect_retry_after_header=True,
+            # After the last attempt hand back the response, callers use raise_for_status()
+            raise_on_status=False,
+        ))
+        self.post_session = self.make_session(pool_maxsize, Retry(
+            total=retries,
+            # A read error or a dropped connection after sending may mean the POST went through
+            read=False,
+            other=0,
+            backoff_factor=backoff_factor,
+            # No forced statuses: urllib3 then retries only 413/429/503 with a Retry-After header
+            status_forcelist=(),
+            allowed_methods={"POST"},
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        ))
+
+    @staticmethod
+    def make_session(pool_maxsize, retry):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_maxsize, pool_maxsize=pool_maxsize, max_retries=retry)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        session = self.post_session if method.upper() == "POST" else self.session
+        return session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def download(self, url, file_path, headers=None, chunk_size=64 * 1024, max_bytes=None, resume=True):
+        """Streams the body to file_path through a fixed-size buffer.
+
+        The data goes to file_path + ".part" and is renamed into place only
+        when complete, so readers never see half a file. A leftover .part from
+        an interrupted run is resumed with a Range request, but only for the
+        same version of the resource: If-Range carries the ETag or
+        Last-Modified of the response the .part came from, and a total size in
+        Content-Range that differs from that response's starts over. A 304
+        response leaves the existing file untouched.
+        """
+        part_path = file_path + ".part"
+        headers = dict(headers or {})
+        state = read_part_state(part_path) if resume and os.path.exists(part_path) else None
+        validator = part_validator(state)
+        offset = os.path.getsize(part_path) if validator else 0
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+            headers["If-Range"] = validator
+        os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+
+        with self.get(url, headers=headers, stream=True) as response:
+            if response.status_code == 304:
+                return response
+            content_range = response.headers.get("Content-Range", "")
+            if response.status_code == 416 or (response.status_code == 206 and (
+                    not content_range.startswith(f"bytes {offset}-")
+                    or content_range.rsplit("/", 1)[-1] != str(state.get("size")))):
+                # The partial file no longer matches the resource, start over
+                response.close()
+                remove_part(part_path)
+                return self.download(url, file_path, headers=headers_without_range(headers),
+                                     chunk_size=chunk_size, max_bytes=max_bytes, resume=False)
+            response.raise_for_status()
+            if response.status_code != 206:
+                offset = 0  # The server ignored the Range header or the resource changed, it sends everything
+                write_part_state(part_path, response)
+            expected = response.headers.get("Content-Length")
+            if max_bytes and expected and offset + int(expected) > max_bytes:
+                raise DownloadTooLarge(f"{url} is {offset + int(expected)} bytes, limit is {max_bytes}", response=response)
+
+            written = offset
+            with open(part_path, "ab" if offset else "wb") as file:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    written += len(chunk)
+                    if max_bytes and written > max_bytes:
+                        file.close()
+                        remove_part(part_path)
+                        raise DownloadTooLarge(f"{url} exceeds the {max_bytes} byte limit", response=response)
+                    file.write(chunk)
+        record(bytes=written - offset)
+        os.replace(part_path, file_path)
+        remove_part(part_path)
+        return response
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client(**kwargs):
+    """Process-wide HttpClient; keyword arguments configure it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient(**kwargs)
+        return _client
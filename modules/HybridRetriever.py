@@ -0,0 +1,148 @@
+import math
+import re
+import time
+import unicodedata
+from collections import Counter
+from typing import Optional
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict, Field
+
+
+def normalize(text):
+    # Lowercase without diacritics, so "Kraków" and "krakow" are the same term
+    text = unicodedata.normalize("NFKD", text.lower().replace("ł", "l"))
+    return "".join(char for char in text if not unicodedata.combining(char))
+
+
+def tokenize(text, stem_length=6):
+    # Cutting words to a prefix is a crude stemmer, enough for Polish case endings (Krakowie -> krakow)
+    return [word[:stem_length] if stem_length and not word.isdigit() else word
+            for word in re.findall(r"\w+", normalize(text))]
+
+
+class BM25Index:
+    """In-memory inverted index with Okapi BM25 scoring over a fixed set of chunks."""
+
+    def __init__(self, chunks, k1=1.5, b=0.75, stem_length=6):
+        # chunks: {chunk id: text}
+        self.k1 = k1
+        self.b = b
+        self.stem_length = stem_length
+        self.postings = {}
+        self.lengths = {}
+        for chunk_id, text in chunks.items():
+            terms = Counter(tokenize(text, stem_length))
+            self.lengths[chunk_id] = sum(terms.values())
+            for term, count in terms.items():
+                self.postings.setdefault(term, {})[chunk_id] = count
+        self.average_length = sum(self.lengths.values()) / len(self.lengths) if self.lengths else 0.0
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def idf(self, term):
+        frequency = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.lengths) - frequency + 0.5) / (frequency + 0.5))
+
+    def search(self, query, k=10):
+        """Returns up to k (chunk id, score) pairs, best first."""
+        scores = {}
+        for term in set(tokenize(query, self.stem_length)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf(term)
+            for chunk_id, count in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[chunk_id] / self.average_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * count * (self.k1 + 1) / (count + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """Merges ranked id lists: every list adds 1 / (k + rank) to each id it contains."""
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+def exact_terms(query, stem_length=6):
+    # Numbers and capitalised names after the first word: the terms a keyword index matches best
+    words = re.findall(r"\w+", query)
+    return {term for i, word in enumerate(words)
+            for term in tokenize(word, stem_length)
+            if word.isdigit() or any(char.isdigit() for char in word) or (i > 0 and word[0].isupper())}
+
+
+class HybridRetriever(BaseRetriever):
+    """BM25 and FAISS results fused with reciprocal rank fusion.
+
+    Queries whose exact terms (numbers, names) all occur in the best BM25 hit
+    are answered from the keyword index alone, without the query embedding
+    round-trip. keyword_margin optionally does the same when the best BM25
+    hit scores that many times the runner-up. A keyword answer with fewer
+    than k chunks is padded from the fused ranking.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    vectorstore: object
+    index: BM25Index
+    documents: dict
+    # Page text -> chunk id, for vector stores that return documents without ids
+    content_ids: dict = Field(default_factory=dict)
+    k: int = 4
+    fetch_k: int = 20
+    rrf_k: int = 60
+    keyword_shortcut: bool = True
+    # None: only the exact-terms check skips the vector search
+    keyword_margin: Optional[float] = None
+    # False answers every query from BM25 alone, e.g. without network access
+    vector_search: bool = True
+    stats: dict = Field(default_factory=lambda: {"queries": 0, "keyword_only": 0, "hybrid": 0, "seconds": 0.0})
+
+    @classmethod
+    def from_chunks(cls, vectorstore, chunks, **kwargs):
+        # chunks: {chunk id: text}, the same fragments the vector store was built from
+        documents = {chunk_id: Document(page_content=text, id=chunk_id) for chunk_id, text in chunks.items()}
+        content_ids = {text: chunk_id for chunk_id, text in chunks.items()}
+        return cls(vectorstore=vectorstore, index=BM25Index(chunks), documents=documents,
+                   content_ids=content_ids, **kwargs)
+
+    def keyword_hits(self, query, hits):
+        if not self.keyword_shortcut or not hits:
+            return False
+        if self.keyword_margin and len(hits) > 1 and hits[0][1] >= self.keyword_margin * hits[1][1]:
+            return True
+        terms = exact_terms(query, self.index.stem_length)
+        best = set(tokenize(self.documents[hits[0][0]].page_content, self.index.stem_length))
+        return bool(terms) and terms <= best
+
+    def vector_ids(self, query):
+        ids = []
+        for document in self.vectorstore.similarity_search(query, k=self.fetch_k):
+            chunk_id = document.id if document.id in self.documents else self.content_ids.get(document.page_content)
+            if chunk_id is not None:
+                ids.append(chunk_id)
+        return ids
+
+    def _get_relevant_documents(self, query, *, run_manager: CallbackManagerForRetrieverRun):
+        start = time.perf_counter()
+        hits = self.index.search(query, self.fetch_k)
+        if not self.vector_search or self.keyword_hits(query, hits):
+            self.stats["keyword_only"] += 1
+            ids = [chunk_id for chunk_id, _ in hits]
+            if self.vector_search and len(ids) < self.k:
+                # Too few keyword hits for k chunks: the rest comes from the fused ranking
+                fused = reciprocal_rank_fusion([ids, self.vector_ids(query)], self.rrf_k)
+                ids += [chunk_id for chunk_id in fused if chunk_id not in ids]
+        else:
+            self.stats["hybrid"] += 1
+            ids = reciprocal_rank_fusion([[chunk_id for chunk_id, _ in hits], self.vector_ids(query)], self.rrf_k)
+        self.stats["queries"] += 1
+        self.stats["seconds"] += time.perf_counter() - start
+        return [self.documents[chunk_id] for chunk_id in ids[:self.k]]
@@ -0,0 +1,112 @@
+import base64
+import io
+import math
+import os
+import threading
+
+from PIL import Image
+
+from modules.Tracing import record
+
+
+def estimate_vision_tokens(width, height, detail="high"):
+    # GPT-4o pricing: fit into 2048x2048, shortest side down to 768, then 170 tokens per 512px tile
+    if detail == "low":
+        return 85
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    return 85 + 170 * math.ceil(width / 512) * math.ceil(height / 512)
+
+
+class ImagePreprocessor:
+    """Downscales and recompresses images before they are sent to a vision model."""
+
+    MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png"}
+
+    def __init__(self, max_edge=1024, format="JPEG", quality=85, detail="auto"):
+        self.max_edge = max_edge
+        self.format = format.upper()
+        self.quality = quality
+        # detail: "low", "high" or "auto" (low when the image fits in a single 512px tile)
+        self.detail = detail
+        self.totals = {"images": 0, "original_bytes": 0, "bytes": 0, "original_tokens": 0, "tokens": 0}
+        self.lock = threading.Lock()
+
+    def cache_key(self):
+        return f"{self.max_edge}:{self.format}:{self.quality}:{self.detail}"
+
+    def choose_detail(self, width, height):
+        if self.detail != "auto":
+            return self.detail
+        return "low" if max(width, height) <= 512 else "high"
+
+    def prepare(self, image_path):
+        """Returns the data URL, the detail level and byte/token stats for one image."""
+        with open(image_path, "rb") as image_file:
+            original = image_file.read()
+        try:
+            image = Image.open(io.BytesIO(original))
+            image.load()
+        except OSError as e:
+            # Not something PIL can decode, send the bytes unchanged
+            print(f"Skipping preprocessing of {image_path}: {e}")
+            return {
+                "data_url": f"data:image/png;base64,{base64.b64encode(original).decode('utf-8')}",
+                "detail": self.detail,
+                "stats": None,
+            }
+        original_size = image.size
+        original_mime = Image.MIME.get(image.format, "image/png")
+
+        if max(image.size) > self.max_edge:
+            image.thumbnail((self.max_edge, self.max_edge), Image.LANCZOS)
+        if self.format == "JPEG" and image.mode not in ("RGB", "L"):
+            # JPEG has no alpha channel, flatten transparent areas onto white
+            background = Image.new("RGB", image.size, "white")
+            rgba = image.convert("RGBA")
+            background.paste(rgba, mask=rgba.getchannel("A"))
+            image = background
+        data, mime = self.encode(image, self.format), self.MIME_TYPES[self.format]
+        if len(data) >= len(original) and image.size != original_size and original_mime == "image/png":
+            # Line art and maps often stay smaller as PNG than as JPEG
+            png = self.encode(image, "PNG")
+            if len(png) < len(data):
+                data, mime = png, "image/png"
+        if len(data) >= len(original) and image.size == original_size:
+            # Recompression did not help, keep the original file
+            data, mime = original, original_mime
+
+        detail = self.choose_detail(*image.size)
+        stats = {
+            "file": os.path.basename(image_path),
+            "original_bytes": len(original),
+            "bytes": len(data),
+            "original_tokens": estimate_vision_tokens(*original_size),
+            "tokens": estimate_vision_tokens(*image.size, detail),
+        }
+        with self.lock:
+            self.totals["images"] += 1
+            for key in ("original_bytes", "bytes", "original_tokens", "tokens"):
+                self.totals[key] += stats[key]
+        record(bytes=len(data))
+        print(f"Prepared {stats['file']}: {stats['original_bytes'] - stats['bytes']} bytes and "
+              f"{stats['original_tokens'] - stats['tokens']} tokens saved ({detail} detail)")
+        return {
+            "data_url": f"data:{mime};base64,{base64.b64encode(data).decode('utf-8')}",
+            "detail": detail,
+            "stats": stats,
+        }
+
+    def encode(self, image, format):
+        buffer = io.BytesIO()
+        image.save(buffer, format=format, quality=self.quality)
+        return buffer.getvalue()
+
+    def report(self):
+        totals = dict(self.totals)
+        totals["bytes_saved"] = totals["original_bytes"] - totals["bytes"]
+        totals["tokens_saved"] = totals["original_tokens"] - totals["tokens"]
+        print(f"Image preprocessing: {totals}")
+        return totals
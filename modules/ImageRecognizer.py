@@ -0,0 +1,32 @@
+from modules.ImagePreprocessor import ImagePreprocessor
+from modules.Tracing import record_usage
+
+
+class ImageRecognizer:
+    def __init__(self, client, preprocessor=None):
+        self.client = client
+        self.preprocessor = preprocessor or ImagePreprocessor()
+
+    def recognize_image(self, image_path, max_tokens, prompt, model):
+        image = self.preprocessor.prepare(image_path)
+        response = self.client.chat.completions.create(
+            model=model,
+            messages=[
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": prompt},
+                        {
+                            "type": "image_url",
+                            "image_url": {
+                                "url": image["data_url"],
+                                "detail": image["detail"],
+                            },
+                        },
+                    ],
+                }
+            ],
+            max_tokens=max_tokens,
+        )
+        record_usage(response)
+        return response.choices[0].message.content.strip()
@@ -0,0 +1,190 @@
+import asyncio
+import hashlib
+import threading
+from concurrent.futures import Future
+
+from modules.DiskCache import DiskCache
+from modules.Tracing import record_usage
+
+
+class LlmGateway:
+    """Single entry point for chat completions, shared by the scripts.
+
+    Owns one sync and one async OpenAI client (each keeps its own connection
+    pool), runs identical in-flight requests once and hands every caller the
+    same response, and keeps deterministic (temperature 0) responses in a
+    DiskCache for ttl seconds.
+    """
+
+    # Kept apart from the media cache that DiskCache.open puts in the same temp directory
+    FILE_NAME = "llm_cache.sqlite"
+
+    def __init__(self, api_key=None, sync_client=None, async_client=None,
+                 cache_dir="temp", ttl=7 * 24 * 3600, max_bytes=64 * 1024 * 1024):
+        self.api_key = api_key
+        self._sync_client = sync_client
+        self._async_client = async_client
+        # The caller's temp directory (e.g. DIR/temp); None keeps only the in-flight deduplication
+        self.cache = DiskCache.open(cache_dir, max_bytes, file_name=self.FILE_NAME) if cache_dir else None
+        self.ttl = ttl
+        self.inflight = {}
+        self.lock = threading.Lock()
+        self.counters = {"requests": 0, "coalesced": 0, "cache_hits": 0}
+
+    @property
+    def sync_client(self):
+        with self.lock:
+            if self._sync_client is None:
+                # openai takes about a second to import, so only code paths that call it pay for it
+                from openai import OpenAI
+                self._sync_client = OpenAI(**self._client_options(self._async_client))
+            return self._sync_client
+
+    @property
+    def async_client(self):
+        with self.lock:
+            if self._async_client is None:
+                from openai import AsyncOpenAI
+                self._async_client = AsyncOpenAI(**self._client_options(self._sync_client))
+            return self._async_client
+
+    def _client_options(self, other):
+        # Build the missing client with the same key and endpoint as the one passed in
+        if other is not None:
+            return {"api_key": other.api_key, "base_url": other.base_url}
+        return {"api_key": self.api_key}
+
+    def cache_key(self, kwargs, client):
+        request = {name: value for name, value in kwargs.items() if name != "timeout"}
+        # Another endpoint or account must not get this one's responses; only a digest of the key goes in
+        account = hashlib.sha256((client.api_key or "").encode("utf-8")).hexdigest()
+        return DiskCache.make_key("chat", str(client.base_url), account, request)
+
+    def cached(self, key, kwargs):
+        if self.cache is None or kwargs.get("temperature") != 0:
+            return None
+        value = self.cache.get(key, max_age=self.ttl)
+        if value is None:
+            return None
+        with self.lock:
+            self.counters["cache_hits"] += 1
+        from openai.types.chat import ChatCompletion
+        return ChatCompletion.model_validate_json(value)
+
+    def store(self, key, kwargs, response):
+        if self.cache is not None and kwargs.get("temperature") == 0:
+            self.cache.put(key, response.model_dump_json())
+
+    def join_or_lead(self, key):
+        # Returns (future, True) for the caller that has to send the request
+        with self.lock:
+            future = self.inflight.get(key)
+            if future is not None:
+                self.counters["coalesced"] += 1
+                return future, False
+            future = Future()
+            self.inflight[key] = future
+            self.counters["requests"] += 1
+            return future, True
+
+    def finish(self, key, future, response=None, error=None):
+        with self.lock:
+            self.inflight.pop(key, None)
+        if error is not None and not isinstance(error, Exception):
+            # A cancelled leader (e.g. by asyncio.wait_for) must not cancel the followers,
+            # they get an ordinary error their own retries can handle
+            error = RuntimeError(f"Identical in-flight request was abandoned ({type(error).__name__})")
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(response)
+
+    def chat(self, client=None, **kwargs):
+        """Sync chat completion; client overrides the shared one, e.g. with_options(timeout=...)."""
+        client = client or self.sync_client
+        key = self.cache_key(kwargs, client)
+        response = self.cached(key, kwargs)
+        if response is not None:
+            return response
+        future, leader = self.join_or_lead(key)
+        if not leader:
+            return future.result()
+        try:
+            response = client.chat.completions.create(**kwargs)
+        except BaseException as e:
+            # BaseException too, so an interrupted request still frees its in-flight slot
+            self.finish(key, future, error=e)
+            raise
+        record_usage(response)
+        self.finish(key, future, response)
+        self.store(key, kwargs, response)
+        return response
+
+    async def achat(self, client=None, **kwargs):
+        """Async counterpart of chat."""
+        client = client or self.async_client
+        key = self.cache_key(kwargs, client)
+        response = self.cached(key, kwargs)
+        if response is not None:
+            return response
+        future, leader = self.join_or_lead(key)
+        if not leader:
+            # shield: a follower timing out must not cancel the future the leader and other followers share
+            waiter = asyncio.wrap_future(future)
+            try:
+                return await asyncio.shield(waiter)
+            except asyncio.CancelledError:
+                # Nobody awaits the waiter any more; read its outcome so asyncio does not warn about it
+                waiter.add_done_callback(lambda waiter: waiter.cancelled() or waiter.exception())
+                raise
+        try:
+            response = await client.chat.completions.create(**kwargs)
+        except BaseException as e:
+            # CancelledError is not an Exception; without this the slot would stay taken forever
+            self.finish(key, future, error=e)
+            raise
+        record_usage(response)
+        self.finish(key, future, response)
+        self.store(key, kwargs, response)
+        return response
+
+    @staticmethod
+    def messages(system_prompt, contents):
+        return [{"role": "system", "content": system_prompt}] + [
+            {"role": "user", "content": content} for content in contents
+        ]
+
+    def complete(self, system_prompt, *contents, model="gpt-4o", max_tokens=1000, **kwargs):
+        """System prompt plus user messages in, stripped answer text out."""
+        response = self.chat(model=model, messages=self.messages(system_prompt, contents),
+                             max_tokens=max_tokens, **kwargs)
+        return response.choices[0].message.content.strip()
+
+    async def acomplete(self, system_prompt, *contents, model="gpt-4o", max_tokens=1000, **kwargs):
+        response = await self.achat(model=model, messages=self.messages(system_prompt, contents),
+                                    max_tokens=max_tokens, **kwargs)
+        return response.choices[0].message.content.strip()
+
+    def stats(self):
+        stats = dict(self.counters)
+        if self.cache is not None:
+            stats["cache_hit_rate"] = self.cache.stats()["hit_rate"]
+        return stats
+
+    def report(self):
+        stats = self.stats()
+        print(f"LLM gateway: {stats}")
+        return stats
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway(**kwargs):
+    """Process-wide LlmGateway; keyword arguments configure it on first use."""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = LlmGateway(**kwargs)
+        return _gateway
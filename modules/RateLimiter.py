@@ -0,0 +1,63 @@
+import asyncio
+import time
+
+
+class RateLimiter:
+    """Async limiter for requests-per-minute and tokens-per-minute budgets."""
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        # Both buckets start full and refill continuously
+        self.request_allowance = float(requests_per_minute or 0)
+        self.token_allowance = float(tokens_per_minute or 0)
+        self.updated_at = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self.updated_at
+        self.updated_at = now
+        if self.requests_per_minute:
+            self.request_allowance = min(
+                self.requests_per_minute,
+                self.request_allowance + elapsed * self.requests_per_minute / 60.0,
+            )
+        if self.tokens_per_minute:
+            self.token_allowance = min(
+                self.tokens_per_minute,
+                self.token_allowance + elapsed * self.tokens_per_minute / 60.0,
+            )
+
+    def _wait_time(self, tokens):
+        wait = 0.0
+        if self.requests_per_minute and self.request_allowance < 1:
+            wait = max(wait, (1 - self.request_allowance) * 60.0 / self.requests_per_minute)
+        if self.tokens_per_minute:
+            # A single request bigger than the whole budget only waits for a full bucket
+            tokens = min(tokens, self.tokens_per_minute)
+            if self.token_allowance < tokens:
+                wait = max(wait, (tokens - self.token_allowance) * 60.0 / self.tokens_per_minute)
+        return wait
+
+    async def acquire(self, tokens=0):
+        # Lock keeps the waiting callers in FIFO order
+        async with self.lock:
+            while True:
+                self._refill()
+                wait = self._wait_time(tokens)
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            if self.requests_per_minute:
+                self.request_allowance -= 1
+            if self.tokens_per_minute:
+                self.token_allowance -= min(tokens, self.tokens_per_minute)
+
+    def settle(self, estimated_tokens, used_tokens):
+        # Give back (or charge) the difference once the real usage is known
+        if self.tokens_per_minute and used_tokens is not None:
+            self.token_allowance = min(
+                self.tokens_per_minute,
+                self.token_allowance + estimated_tokens - used_tokens,
+            )
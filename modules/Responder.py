@@ -1,5 +1,6 @@
 import json
-import requests
+from modules.HttpClient import get_client
+from modules.Tracing import traced
 
 class ReportSenderAnswerJson:
     def __init__(self, api_key, task, report_url):
@@ -7,6 +8,7 @@ class ReportSenderAnswerJson:
         self.task = task
         self.report_url = report_url
 
+    @traced()
     def send_report(self, answer):
         # Ensure the answer is a JSON object
         if isinstance(answer, str):
@@ -21,14 +23,18 @@ class ReportSenderAnswerJson:
             "apikey": self.api_key,
             "answer": answer  # Send the JSON object directly
         }
+        response = None
         try:
-            response = requests.post(self.report_url, json=json_structure)
+            response = get_client().post(self.report_url, json=json_structure)
             response.raise_for_status()
             print("Report sent successfully.")
             print("Response:", response.text)
+            # Returned only on success, so callers can tell a failed report apart
+            return response
         except Exception as e:
             print(f"Error sending report: {e}")
-            print("Response:", response.text)
+            if response is not None:
+                print("Response:", response.text)
 
 class ReportSenderAnswerString:
     def __init__(self, api_key, task, report_url):
@@ -36,6 +42,7 @@ class ReportSenderAnswerString:
         self.task = task
         self.report_url = report_url
 
+    @traced()
     def send_report(self, answer):
         answer = answer.split()[0]   
         json_structure = {
@@ -43,13 +50,15 @@ class ReportSenderAnswerString:
             "apikey": self.api_key,
             "answer": answer  
         }
+        response = None
         try:
-            response = requests.post(self.report_url, json=json_structure)
+            response = get_client().post(self.report_url, json=json_structure)
             response.raise_for_status()
             print("Report sent successfully.")
             print("Response:", response.text)
         except Exception as e:
             print(f"Error sending report: {e}")
-            print("Response:", response.text)
+            if response is not None:
+                print("Response:", response.text)
             
          
@@ -0,0 +1,35 @@
+import asyncio
+import random
+
+
+def backoff_delay(attempt, base_delay=1.0, max_delay=30.0):
+    # Exponential backoff with full jitter, so parallel callers do not retry in lockstep
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+async def retry_async(func, retries=3, timeout=None, base_delay=1.0, max_delay=30.0):
+    """Awaits func() with a per-attempt timeout, retrying failures with jittered backoff."""
+    for attempt in range(retries + 1):
+        try:
+            if timeout:
+                return await asyncio.wait_for(func(), timeout)
+            return await func()
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            print(f"Attempt {attempt + 1} failed ({e!r}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+async def map_concurrently(items, func, max_concurrency=8, timeout=None, retries=3):
+    """Runs async func(value) for every item of a dict; returns {key: result or exception}."""
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def run(value):
+        async with semaphore:
+            return await retry_async(lambda: func(value), retries=retries, timeout=timeout)
+
+    keys = list(items)
+    results = await asyncio.gather(*(run(items[key]) for key in keys), return_exceptions=True)
+    return dict(zip(keys, results))
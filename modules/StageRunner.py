@@ -0,0 +1,157 @@
+import contextvars
+import hashlib
+import os
+import pickle
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from modules.DiskCache import DiskCache
+from modules.Tracing import span
+
+
+class StageError(Exception):
+    def __init__(self, errors):
+        # errors: {stage name: exception}
+        self.errors = errors
+        super().__init__("; ".join(f"{name}: {error}" for name, error in errors.items()))
+
+
+class Stage:
+    def __init__(self, name, func, inputs=(), params=(), version=1, persist=True):
+        self.name = name
+        self.func = func
+        # Stages whose outputs are passed to func as keyword arguments of the same name
+        self.inputs = tuple(inputs)
+        # Runner parameters passed to func and hashed into the key; keep secrets out of them
+        self.params = tuple(params)
+        # Bump when func changes in a way that should invalidate old artifacts
+        self.version = version
+        # False for outputs that cannot be pickled; such a stage runs every time its dependents need it
+        self.persist = persist
+
+
+class StageRunner:
+    """Runs named stages in dependency order, independent ones in parallel.
+
+    Every stage output is pickled to artifact_dir under a key made of the
+    stage name, version, parameters and the digests of its input artifacts.
+    A rerun loads the artifacts whose key still matches and runs only the
+    stages after the first change or failure.
+    """
+
+    def __init__(self, artifact_dir, params=None, max_workers=4):
+        self.artifact_dir = artifact_dir
+        self.params = dict(params or {})
+        self.max_workers = max_workers
+        self.stages = {}
+        self.status = {}
+
+    def add(self, name, func, inputs=(), params=(), version=1, persist=True):
+        self.stages[name] = Stage(name, func, inputs, params, version, persist)
+        return func
+
+    def stage(self, name=None, inputs=(), params=(), version=1, persist=True):
+        """Decorator registering func as a stage, named after the function by default."""
+        def decorate(func):
+            return self.add(name or func.__name__, func, inputs, params, version, persist)
+        return decorate
+
+    def plan(self, targets=None):
+        """Returns the stages needed for targets (all stages by default) in dependency order."""
+        order, visiting = [], set()
+
+        def visit(name):
+            if name in order:
+                return
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage {name!r}")
+            if name in visiting:
+                raise ValueError(f"Stage {name!r} depends on itself")
+            visiting.add(name)
+            for dependency in self.stages[name].inputs:
+                visit(dependency)
+            visiting.discard(name)
+            order.append(name)
+
+        for target in targets or self.stages:
+            visit(target)
+        return order
+
+    def key(self, stage, digests):
+        params = {name: self.params[name] for name in stage.params}
+        return DiskCache.make_key("stage", stage.name, stage.version, params,
+                                  [digests[dependency] for dependency in stage.inputs])
+
+    def artifact_path(self, stage, key):
+        return os.path.join(self.artifact_dir, f"{stage.name}-{key[:20]}.pkl")
+
+    def execute(self, stage, inputs, digests, force):
+        """Returns (output, digest, "cached" or "done")."""
+        key = self.key(stage, digests)
+        path = self.artifact_path(stage, key)
+        if stage.persist and not force and os.path.exists(path):
+            with open(path, "rb") as file:
+                payload = file.read()
+            return pickle.loads(payload), hashlib.sha256(payload).hexdigest(), "cached"
+
+        with span(f"stage {stage.name}"):
+            output = stage.func(**inputs, **{name: self.params[name] for name in stage.params})
+        if not stage.persist:
+            # Dependents are keyed by this stage's inputs instead of its output
+            return output, key, "done"
+        payload = pickle.dumps(output)
+        os.makedirs(self.artifact_dir, exist_ok=True)
+        # Written under a temporary name first, so a crash never leaves half an artifact behind
+        with open(path + ".part", "wb") as file:
+            file.write(payload)
+        os.replace(path + ".part", path)
+        return output, hashlib.sha256(payload).hexdigest(), "done"
+
+    def run(self, targets=None, force=()):
+        """Runs targets and what they depend on; returns {stage name: output}.
+
+        force: stage names to run even when their artifact exists. A failed
+        stage blocks only its dependents; StageError is raised after the rest
+        has finished.
+        """
+        order = self.plan(targets)
+        pending = list(order)
+        outputs, digests, errors = {}, {}, {}
+        self.status = {}
+        timings = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            running = {}
+            while pending or running:
+                for name in list(pending):
+                    stage = self.stages[name]
+                    if any(dependency in errors or self.status.get(dependency) == "blocked" for dependency in stage.inputs):
+                        pending.remove(name)
+                        self.status[name] = "blocked"
+                    elif all(dependency in outputs for dependency in stage.inputs):
+                        pending.remove(name)
+                        inputs = {dependency: outputs[dependency] for dependency in stage.inputs}
+                        timings[name] = time.perf_counter()
+                        # Spans opened in the worker thread stay under the caller's span
+                        future = pool.submit(contextvars.copy_context().run, self.execute, stage, inputs,
+                                             {dependency: digests[dependency] for dependency in stage.inputs},
+                                             name in force)
+                        running[future] = name
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    timings[name] = time.perf_counter() - timings[name]
+                    try:
+                        outputs[name], digests[name], self.status[name] = future.result()
+                    except Exception as e:
+                        print(f"Stage {name} failed: {e}")
+                        self.status[name] = "failed"
+                        errors[name] = e
+
+        for name in order:
+            seconds = f"{timings[name]:.2f}s" if name in timings else "-"
+            print(f"Stage {name}: {self.status.get(name, 'pending')} ({seconds})")
+        if errors:
+            raise StageError(errors)
+        return outputs
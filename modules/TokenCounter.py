@@ -0,0 +1,35 @@
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+_encodings = {}
+
+
+def get_encoding(encoding_name="cl100k_base"):
+    # Loaded once per process; None when tiktoken or its encoding files are unavailable
+    if encoding_name not in _encodings:
+        try:
+            _encodings[encoding_name] = tiktoken.get_encoding(encoding_name) if tiktoken else None
+        except Exception as e:
+            print(f"Token counting falls back to an estimate: {e}")
+            _encodings[encoding_name] = None
+    return _encodings[encoding_name]
+
+
+def count_tokens(text, encoding_name="cl100k_base"):
+    encoding = get_encoding(encoding_name)
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    # Roughly four characters per token for English and Polish prose
+    return len(text) // 4 + 1
+
+
+def split_by_tokens(text, max_tokens, encoding_name="cl100k_base"):
+    """Cuts text into pieces of at most max_tokens tokens."""
+    encoding = get_encoding(encoding_name)
+    if encoding:
+        tokens = encoding.encode(text, disallowed_special=())
+        return [encoding.decode(tokens[i:i + max_tokens]) for i in range(0, len(tokens), max_tokens)] or [""]
+    size = max_tokens * 4
+    return [text[i:i + size] for i in range(0, len(text), size)] or [""]
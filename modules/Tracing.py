@@ -0,0 +1,166 @@
+import asyncio
+import contextvars
+import functools
+import json
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed stage; numeric counters (tokens, bytes, cache hits) add up while it is open."""
+
+    def __init__(self, name, parent=None, attributes=None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = dict(attributes or {})
+        self.counters = {}
+        self.status = "OK"
+        self.start = time.time_ns()
+        self.end = None
+        self.lock = threading.Lock()
+
+    @property
+    def duration(self):
+        return ((self.end or time.time_ns()) - self.start) / 1e9
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def add(self, **counts):
+        with self.lock:
+            for name, value in counts.items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_dict(self):
+        # Field names follow the OpenTelemetry span model, so the lines can be converted as they are
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "start_time_unix_nano": self.start,
+            "end_time_unix_nano": self.end,
+            "duration_s": round(self.duration, 6),
+            "status": self.status,
+            "attributes": {**self.attributes, **self.counters},
+        }
+
+
+class Tracer:
+    """Collects finished spans, appends them as JSON lines to path and prints a per-stage summary."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.spans = []
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, **attributes):
+        span = Span(name, _current_span.get(), attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "ERROR"
+            span.set(error=repr(e))
+            raise
+        finally:
+            span.end = time.time_ns()
+            _current_span.reset(token)
+            self.finish(span)
+
+    def finish(self, span):
+        with self.lock:
+            self.spans.append(span)
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as file:
+                    file.write(json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n")
+
+    def summary(self):
+        stages = {}
+        with self.lock:
+            spans = list(self.spans)
+        for span in spans:
+            stage = stages.setdefault(span.name, {"calls": 0, "errors": 0, "seconds": 0.0, "max": 0.0, "counters": {}})
+            stage["calls"] += 1
+            stage["errors"] += span.status != "OK"
+            stage["seconds"] += span.duration
+            stage["max"] = max(stage["max"], span.duration)
+            for name, value in span.counters.items():
+                stage["counters"][name] = stage["counters"].get(name, 0) + value
+        return stages
+
+    def print_summary(self):
+        stages = self.summary()
+        if not stages:
+            return stages
+        width = max(len("stage"), *(len(name) for name in stages))
+        print(f"{'stage':<{width}} {'calls':>6} {'errors':>6} {'total s':>9} {'mean s':>8} {'max s':>8} "
+              f"{'tokens':>9} {'bytes':>12} {'cache hit':>9}")
+        for name, stage in stages.items():
+            counters = stage["counters"]
+            tokens = counters.get("prompt_tokens", 0) + counters.get("completion_tokens", 0)
+            lookups = counters.get("cache_hits", 0) + counters.get("cache_misses", 0)
+            hit_rate = f"{counters.get('cache_hits', 0) / lookups:.0%}" if lookups else "-"
+            print(f"{name:<{width}} {stage['calls']:>6} {stage['errors']:>6} {stage['seconds']:>9.2f} "
+                  f"{stage['seconds'] / stage['calls']:>8.2f} {stage['max']:>8.2f} "
+                  f"{tokens:>9} {counters.get('bytes', 0):>12} {hit_rate:>9}")
+        return stages
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer():
+    """Process-wide Tracer; spans go to the TRACE_FILE JSON lines file when it is set."""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = Tracer(os.environ.get("TRACE_FILE"))
+        return _tracer
+
+
+def span(name, **attributes):
+    return get_tracer().span(name, **attributes)
+
+
+def traced(name=None, **attributes):
+    """Decorator that runs a sync or async function inside a span named after it."""
+    def decorate(func):
+        span_name = name or func.__qualname__
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name, **attributes):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name, **attributes):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def record(**counts):
+    """Adds counters to the innermost open span; a no-op outside of any span."""
+    current = _current_span.get()
+    if current is not None:
+        current.add(**counts)
+
+
+def record_usage(response):
+    # Chat completions report prompt/completion tokens, embeddings only prompt tokens
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        record(prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+               completion_tokens=getattr(usage, "completion_tokens", 0) or 0)
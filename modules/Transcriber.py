@@ -1,12 +1,173 @@
-class Transcriber:
-    def __init__(self, client):
-        self.client = client  
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class RemoteWhisperBackend:
+    name = "remote"
+
+    def __init__(self, client, model="whisper-1"):
+        self.client = client
+        self.model = model
 
     def transcribe(self, file_path, language="pl"):
-        audio_file= open(file_path, "rb")
-        transcription = self.client.audio.transcriptions.create(
-            language=language,
-            model="whisper-1", 
-            file=audio_file
-        )
+        # The open file is streamed by the HTTP client instead of being read into memory first
+        with open(file_path, "rb") as audio_file:
+            transcription = self.client.audio.transcriptions.create(
+                language=language,
+                model=self.model,
+                file=audio_file
+            )
         return transcription.text
+
+
+class LocalWhisperBackend:
+    name = "local"
+
+    def __init__(self, model_name="base", engine=None):
+        # engine: "faster-whisper", "whisper" or None to use whichever is installed
+        self.model_name = model_name
+        self.engine = engine
+        self.model = None
+        self.lock = threading.Lock()
+        # One model instance is not shared by concurrent transcriptions
+        self.transcribe_lock = threading.Lock()
+
+    def load(self):
+        # Loaded on first use and kept resident for the following files
+        with self.lock:
+            if self.model is None:
+                if self.engine in (None, "faster-whisper"):
+                    try:
+                        from faster_whisper import WhisperModel
+                        self.model = WhisperModel(self.model_name, compute_type="int8")
+                        self.engine = "faster-whisper"
+                    except ImportError:
+                        if self.engine:
+                            raise
+                if self.model is None:
+                    import whisper
+                    self.model = whisper.load_model(self.model_name)
+                    self.engine = "whisper"
+        return self.model
+
+    def transcribe(self, file_path, language="pl"):
+        model = self.load()
+        with self.transcribe_lock:
+            if self.engine == "faster-whisper":
+                segments, _ = model.transcribe(file_path, language=language)
+                return " ".join(segment.text.strip() for segment in segments)
+            return model.transcribe(file_path, language=language)["text"]
+
+
+def audio_duration(file_path):
+    # ffprobe reads the container header only; None when it is not available
+    try:
+        output = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", file_path],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        return float(output.strip())
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        return None
+
+
+class Transcriber:
+    def __init__(self, client, local_backend=None, route_by="duration", local_limit=60, local_for="short",
+                 vad=None, segment_seconds=600, segment_workers=4, timestamps=False):
+        self.remote = RemoteWhisperBackend(client) if client else None
+        self.local = local_backend
+        # vad: a modules.VoiceActivity.VoiceActivityDetector; silence is cut out before transcription
+        self.vad = vad
+        # Speech is sent in chunks of up to segment_seconds, segment_workers at a time
+        self.segment_seconds = segment_seconds
+        self.segment_workers = segment_workers
+        self.timestamps = timestamps
+        # route_by: "duration" (seconds, via ffprobe) or "size" (bytes)
+        self.route_by = route_by
+        self.local_limit = local_limit
+        # local_for: "short" sends files up to the limit to the local backend, "long" the ones above it
+        self.local_for = local_for
+        self.metrics = {}
+        self.metrics_lock = threading.Lock()
+
+    def measure(self, file_path):
+        if self.route_by == "size":
+            return os.path.getsize(file_path)
+        duration = audio_duration(file_path)
+        if duration is None:
+            # Without ffprobe assume roughly 128 kbit/s audio
+            duration = os.path.getsize(file_path) / 16000
+        return duration
+
+    def choose_backend(self, file_path):
+        if self.local is None or self.remote is None:
+            return self.local or self.remote
+        is_short = self.measure(file_path) <= self.local_limit
+        if is_short == (self.local_for == "short"):
+            return self.local
+        return self.remote
+
+    def record(self, backend, seconds, size, failed):
+        with self.metrics_lock:
+            metrics = self.metrics.setdefault(
+                backend.name, {"calls": 0, "errors": 0, "seconds": 0.0, "bytes": 0}
+            )
+            metrics["calls"] += 1
+            metrics["errors"] += int(failed)
+            metrics["seconds"] += seconds
+            metrics["bytes"] += size
+
+    def transcribe(self, file_path, language="pl"):
+        if self.vad is not None:
+            return self.transcribe_speech(file_path, language)
+        return self.transcribe_file(file_path, language)
+
+    def transcribe_speech(self, file_path, language="pl"):
+        """Transcribes only the speech in file_path, chunk by chunk in parallel, stitched in time order."""
+        from modules.VoiceActivity import load_audio, stitch, write_wav
+        try:
+            samples = load_audio(file_path, self.vad.sample_rate)
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"Cannot decode {file_path} for voice activity detection, sending it whole: {e}")
+            return self.transcribe_file(file_path, language)
+        chunks = self.vad.chunks(samples, self.segment_seconds)
+        if not chunks:
+            return ""
+        with tempfile.TemporaryDirectory() as directory:
+            paths = []
+            for i, (start, chunk) in enumerate(chunks):
+                paths.append(os.path.join(directory, f"{i:04d}.wav"))
+                write_wav(paths[-1], chunk, self.vad.sample_rate)
+            with ThreadPoolExecutor(max_workers=self.segment_workers) as pool:
+                texts = list(pool.map(lambda path: self.transcribe_file(path, language), paths))
+        return stitch([(start, text) for (start, _), text in zip(chunks, texts)], self.timestamps)
+
+    def transcribe_file(self, file_path, language="pl"):
+        backend = self.choose_backend(file_path)
+        size = os.path.getsize(file_path)
+        start = time.perf_counter()
+        failed = True
+        try:
+            text = backend.transcribe(file_path, language)
+            failed = False
+            return text
+        finally:
+            self.record(backend, time.perf_counter() - start, size, failed)
+
+    def transcribe_many(self, file_paths, language="pl", workers=4):
+        # Remote uploads overlap with each other and with the local model working through its share
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            texts = pool.map(lambda file_path: self.transcribe(file_path, language), file_paths)
+            return dict(zip(file_paths, texts))
+
+    def report(self):
+        for name, metrics in self.metrics.items():
+            calls = metrics["calls"] or 1
+            print(f"{name}: {metrics['calls']} files, {metrics['errors']} errors, "
+                  f"{metrics['seconds'] / calls:.2f}s avg latency, "
+                  f"{metrics['bytes'] / max(metrics['seconds'], 1e-9) / 1024:.0f} KiB/s")
+        return self.metrics
@@ -0,0 +1,80 @@
+import math
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("flat", "ivf", "hnsw", "ivfpq")
+
+
+def choose_index_type(count):
+    """Picks an index for count vectors, following the FAISS guidelines for L2 search."""
+    # Exact search stays fast enough for a few articles
+    if count < 10_000:
+        return "flat"
+    # Inverted lists cut each query to a few clusters
+    if count < 1_000_000:
+        return "ivf"
+    # Past a million vectors memory matters more, product quantisation keeps ~1/16 of it
+    return "ivfpq"
+
+
+def index_type_of(index):
+    # Checked most specific first, IndexIVFPQ is also an IndexIVF
+    for index_type, cls in (("ivfpq", faiss.IndexIVFPQ), ("ivf", faiss.IndexIVF),
+                            ("hnsw", faiss.IndexHNSW), ("flat", faiss.IndexFlat)):
+        if isinstance(faiss.downcast_index(index), cls):
+            return index_type
+    return None
+
+
+def supports_removal(index_type):
+    # LangChain's FAISS.delete renumbers the remaining vectors, which matches only flat indexes;
+    # IVF keeps the old ids and HNSW graphs cannot drop nodes, so those are rebuilt instead
+    return index_type == "flat"
+
+
+def cluster_count(count):
+    return max(1, min(int(4 * math.sqrt(count)), count // 39))
+
+
+def pq_subquantizers(dim, target=64):
+    # Largest divisor of dim not above target, so every sub-vector has the same width
+    return max(m for m in range(1, min(dim, target) + 1) if dim % m == 0)
+
+
+def configure_search(index, nprobe=16, ef_search=64):
+    """Sets the query-time accuracy knobs, which are not kept by every FAISS version on disk."""
+    # The downcast view shares the C++ object but not its ownership, so the original is returned
+    typed = faiss.downcast_index(index)
+    if isinstance(typed, faiss.IndexIVF):
+        typed.nprobe = min(nprobe, typed.nlist)
+    elif isinstance(typed, faiss.IndexHNSW):
+        typed.hnsw.efSearch = ef_search
+    return index
+
+
+def make_index(index_type, vectors, nprobe=16, hnsw_m=32, ef_search=64, sample_size=None, seed=0):
+    """Returns an empty index of index_type, trained on a sample of vectors when it needs training."""
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    count, dim = vectors.shape
+    if index_type == "flat":
+        return faiss.IndexFlatL2(dim)
+    if index_type == "hnsw":
+        return configure_search(faiss.IndexHNSWFlat(dim, hnsw_m), ef_search=ef_search)
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}, expected one of {INDEX_TYPES}")
+
+    nlist = cluster_count(count)
+    quantizer = faiss.IndexFlatL2(dim)
+    if index_type == "ivf":
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+    else:
+        # 8-bit codes need ~10k training points; smaller corpora get coarser codebooks
+        nbits = min(8, max(4, int(math.log2(max(count, 1) / 39)))) if count >= 624 else 4
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_subquantizers(dim), nbits)
+
+    # k-means on a random sample; FAISS wants at least 39 points per cluster
+    sample_size = sample_size or min(count, 64 * nlist)
+    sample = vectors[np.random.default_rng(seed).choice(count, sample_size, replace=False)] if sample_size < count else vectors
+    index.train(sample)
+    return configure_search(index, nprobe=nprobe)
@@ -0,0 +1,179 @@
+import subprocess
+import threading
+import wave
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+def load_audio(file_path, sample_rate=SAMPLE_RATE):
+    """Decodes a recording to mono float32 samples in [-1, 1].
+
+    WAV files are read with the standard library; anything else goes through
+    ffmpeg, the same way whisper.load_audio does it.
+    """
+    if file_path.lower().endswith(".wav"):
+        with wave.open(file_path, "rb") as wav:
+            if wav.getsampwidth() == 2 and wav.getframerate() == sample_rate:
+                samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype="<i2")
+                return samples.reshape(-1, wav.getnchannels()).mean(axis=1).astype(np.float32) / 32768.0
+    output = subprocess.run(
+        ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", file_path,
+         "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "-"],
+        capture_output=True, check=True,
+    ).stdout
+    return np.frombuffer(output, dtype="<i2").astype(np.float32) / 32768.0
+
+
+def write_wav(file_path, samples, sample_rate=SAMPLE_RATE):
+    # 16-bit mono PCM, accepted by Whisper locally and by the transcription API
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    with wave.open(file_path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm.tobytes())
+
+
+def frame_energy(samples, frame_length):
+    """RMS level of every full frame, in dB relative to full scale."""
+    frames = samples[:len(samples) // frame_length * frame_length].reshape(-1, frame_length)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+
+def format_timestamp(seconds):
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(int(minutes), 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:04.1f}" if hours else f"{minutes:02d}:{seconds:04.1f}"
+
+
+def stitch(pieces, timestamps=True):
+    """Joins (start seconds, text) pieces in time order, each on its own line prefixed with [mm:ss.s]."""
+    lines = []
+    for start, text in sorted(pieces, key=lambda piece: piece[0]):
+        text = text.strip()
+        if text:
+            lines.append(f"[{format_timestamp(start)}] {text}" if timestamps else text)
+    return ("\n" if timestamps else " ").join(lines)
+
+
+class VoiceActivityDetector:
+    """Energy-based voice activity detection over fixed-length frames.
+
+    A frame counts as speech when it is margin_db above the recording's noise
+    floor (a low percentile of the frame levels) and above min_level_db; a
+    recording without that much dynamic range is judged by min_level_db alone.
+    Gaps shorter than min_silence_ms are bridged, bursts shorter than
+    min_speech_ms are dropped and every segment is padded so word edges are
+    not clipped.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, frame_ms=30, margin_db=12.0, min_level_db=-50.0,
+                 noise_percentile=10, min_speech_ms=200, min_silence_ms=600, padding_ms=250):
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.margin_db = margin_db
+        self.min_level_db = min_level_db
+        self.noise_percentile = noise_percentile
+        self.min_speech_ms = min_speech_ms
+        self.min_silence_ms = min_silence_ms
+        self.padding_ms = padding_ms
+        self.totals = {"recordings": 0, "segments": 0, "audio_seconds": 0.0, "speech_seconds": 0.0}
+        self.lock = threading.Lock()
+
+    def cache_key(self):
+        return (f"{self.frame_ms}:{self.margin_db}:{self.min_level_db}:{self.noise_percentile}:"
+                f"{self.min_speech_ms}:{self.min_silence_ms}:{self.padding_ms}")
+
+    def frames(self, milliseconds):
+        return max(1, round(milliseconds / self.frame_ms))
+
+    def segments(self, samples):
+        """Returns [(start sample, end sample)] of the speech in samples."""
+        frame_length = self.sample_rate * self.frame_ms // 1000
+        levels = frame_energy(samples, frame_length)
+        if not len(levels):
+            return []
+        floor = np.percentile(levels, self.noise_percentile)
+        if np.percentile(levels, 100 - self.noise_percentile) - floor < self.margin_db:
+            # No quiet stretch to measure the noise against: all speech or all silence
+            speech = levels > self.min_level_db
+        else:
+            speech = levels > max(floor + self.margin_db, self.min_level_db)
+
+        # Runs of speech frames as [start, end) frame indexes
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], speech.astype(np.int8), [0]))))
+        runs = edges.reshape(-1, 2).tolist()
+        merged = []
+        for start, end in runs:
+            if merged and start - merged[-1][1] < self.frames(self.min_silence_ms):
+                merged[-1][1] = end
+            else:
+                merged.append([start, end])
+        padding = self.frames(self.padding_ms)
+        result = []
+        for start, end in merged:
+            if end - start < self.frames(self.min_speech_ms):
+                continue
+            start, end = max(0, start - padding) * frame_length, min(len(levels), end + padding) * frame_length
+            if result and start <= result[-1][1]:
+                result[-1] = (result[-1][0], end)
+            else:
+                result.append((start, end))
+        if result and result[-1][1] == len(levels) * frame_length:
+            # Keep the partial frame at the very end
+            result[-1] = (result[-1][0], len(samples))
+        return result
+
+    def chunks(self, samples, max_seconds=600):
+        """Returns [(start seconds, samples)] of speech, packed into chunks of up to max_seconds.
+
+        Chunks are cut at silences, so each one can be transcribed on its own
+        and in parallel. A single segment longer than max_seconds is split.
+        """
+        limit = int(max_seconds * self.sample_rate)
+        segments = []
+        for start, end in self.segments(samples):
+            segments += [(offset, min(offset + limit, end)) for offset in range(start, end, limit)]
+
+        pause = np.zeros(self.sample_rate // 4, dtype=samples.dtype)
+        chunks = []
+        for start, end in segments:
+            # Segments that fit are glued with a short pause instead of their original silence
+            if chunks and chunks[-1][2] + len(pause) + (end - start) <= limit:
+                chunks[-1][1].append((start, end))
+                chunks[-1][2] += len(pause) + end - start
+            else:
+                chunks.append([start, [(start, end)], end - start])
+        result = []
+        for start, parts, _ in chunks:
+            pieces = []
+            for part_start, part_end in parts:
+                pieces += [samples[part_start:part_end], pause]
+            result.append((start / self.sample_rate, np.concatenate(pieces[:-1])))
+
+        self.count(len(samples), sum(end - start for start, end in segments), len(segments))
+        return result
+
+    def count(self, audio_samples, speech_samples, segments):
+        with self.lock:
+            self.totals["recordings"] += 1
+            self.totals["segments"] += segments
+            self.totals["audio_seconds"] += audio_samples / self.sample_rate
+            self.totals["speech_seconds"] += speech_samples / self.sample_rate
+
+    def stats(self):
+        with self.lock:
+            totals = dict(self.totals)
+        totals["removed_seconds"] = round(totals["audio_seconds"] - totals["speech_seconds"], 1)
+        totals["removed_share"] = round(totals["removed_seconds"] / totals["audio_seconds"], 3) if totals["audio_seconds"] else 0.0
+        totals["audio_seconds"] = round(totals["audio_seconds"], 1)
+        totals["speech_seconds"] = round(totals["speech_seconds"], 1)
+        return totals
+
+    def report(self):
+        totals = self.stats()
+        print(f"Voice activity: {totals}")
+        return totals
@@ -1,38 +1,114 @@
 import os
-from pydub import AudioSegment
-import whisper
-from openai import AsyncOpenAI
+import json
+from concurrent.futures import ProcessPoolExecutor
 import asyncio
-import requests
+from modules.HttpClient import get_client
+from modules.ContextBuilder import ContextBuilder
+from modules.LlmGateway import get_gateway
+from modules.Tracing import get_tracer, span, traced
+
+# Whisper models loaded in this process, kept resident between files
+_models = {}
+# Same as whisper.audio.SAMPLE_RATE; whisper pulls in torch, so it is only imported where audio is decoded
+SAMPLE_RATE = 16000
+
+def get_whisper_model(model_name):
+    if model_name not in _models:
+        import whisper
+        _models[model_name] = whisper.load_model(model_name)
+    return _models[model_name]
+
+def _init_worker(model_name, threads):
+    # Each pool worker loads the model once and splits the cores with the other workers
+    import torch
+    torch.set_num_threads(threads)
+    get_whisper_model(model_name)
+
+def _transcribe_chunk(model_name, audio):
+    return get_whisper_model(model_name).transcribe(audio)['text']
 
 class AudioTranscriber:
-    def __init__(self, directory):
+    def __init__(self, directory, model_name="base", workers=None, chunk_seconds=600, vad=True, timestamps=False):
         self.directory = directory
-        self.model = whisper.load_model("base")  # Load the Whisper model
+        self.model_name = model_name
+        self.workers = workers or os.cpu_count() or 1
+        # Long recordings are cut into chunks that can be transcribed in parallel
+        self.chunk_seconds = chunk_seconds
+        # Silence is dropped before Whisper sees it; pass vad=False to send whole recordings
+        if vad is True:
+            from modules.VoiceActivity import VoiceActivityDetector
+            vad = VoiceActivityDetector(SAMPLE_RATE)
+        self.vad = vad or None
+        # timestamps=True prefixes every chunk with its [mm:ss.s] start time; off by default,
+        # since Answerer feeds the saved transcripts to the LLM as context
+        self.timestamps = timestamps
 
+    @property
+    def model(self):
+        return get_whisper_model(self.model_name)
+
+    def list_files(self):
+        return sorted(filename for filename in os.listdir(self.directory) if filename.endswith(".m4a"))
+
+    @traced()
     def convert_and_transcribe(self):
-        for filename in os.listdir(self.directory):
-            if filename.endswith(".m4a"):
+        filenames = self.list_files()
+        if self.workers <= 1:
+            for filename in filenames:
                 print(f"Processing file: {filename}")
                 self.process_file(filename)
+            self.report()
+            return
 
+        threads = max(1, (os.cpu_count() or 1) // self.workers)
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(self.model_name, threads)) as pool:
+            jobs = {}
+            for filename in filenames:
+                print(f"Processing file: {filename}")
+                audio = self.load_audio(os.path.join(self.directory, filename))
+                jobs[filename] = [(start, pool.submit(_transcribe_chunk, self.model_name, chunk))
+                                  for start, chunk in self.split_audio(audio)]
+            for filename, futures in jobs.items():
+                # Same span name as the sequential branch, so both show up as one stage in the summary
+                with span("AudioTranscriber.process_file", file=filename, chunks=len(futures)):
+                    text = self.stitch([(start, future.result()) for start, future in futures])
+                    self.save_transcription(text, filename)
+                print(f"Transcription for {filename} completed.")
+        self.report()
+
+    def report(self):
+        if self.vad:
+            self.vad.report()
+
+    @traced()
     def process_file(self, filename):
         file_path = os.path.join(self.directory, filename)
-        wav_path = self.convert_to_wav(file_path)
-        self.transcribe_audio(wav_path, filename)
-        os.remove(wav_path)
-
-    def convert_to_wav(self, file_path):
-        audio = AudioSegment.from_file(file_path, format="m4a")
-        wav_path = file_path.replace(".m4a", ".wav")
-        audio.export(wav_path, format="wav")
-        print(f"Converted {file_path} to {wav_path}")
-        return wav_path
-
-    def transcribe_audio(self, wav_path, original_filename):
+        audio = self.load_audio(file_path)
+        self.transcribe_audio(audio, filename)
+
+    def load_audio(self, file_path):
+        # ffmpeg decodes straight to a 16 kHz mono float32 array, no temporary WAV on disk
+        import whisper
+        audio = whisper.load_audio(file_path)
+        print(f"Decoded {file_path} ({len(audio) / SAMPLE_RATE:.1f}s)")
+        return audio
+
+    def split_audio(self, audio):
+        """Returns [(start seconds, samples)]: speech chunks cut at silences, or fixed slices without VAD."""
+        if self.vad:
+            return self.vad.chunks(audio, self.chunk_seconds)
+        chunk_size = int(self.chunk_seconds * SAMPLE_RATE)
+        return [(start / SAMPLE_RATE, audio[start:start + chunk_size])
+                for start in range(0, len(audio), chunk_size)] or [(0.0, audio)]
+
+    def stitch(self, pieces):
+        from modules.VoiceActivity import stitch
+        return stitch(pieces, self.timestamps)
+
+    def transcribe_audio(self, audio, original_filename):
         # Use Whisper to transcribe the audio
-        result = self.model.transcribe(wav_path)
-        text = result['text']
+        text = self.stitch([(start, self.model.transcribe(chunk)['text']) for start, chunk in self.split_audio(audio)])
         self.save_transcription(text, original_filename)
         print(f"Transcription for {original_filename} completed.")
 
@@ -43,9 +119,16 @@ class AudioTranscriber:
         print(f"Saved transcription to {text_file_path}")
 
 class Answerer:
-    def __init__(self, directory, api_key):
+    def __init__(self, directory, api_key, gateway=None):
         self.directory = directory
-        self.client = AsyncOpenAI(api_key=api_key)
+        # Cached responses live next to the recordings, not wherever the script was started
+        self.gateway = gateway or get_gateway(api_key=api_key, cache_dir=os.path.join(directory, "temp"))
+
+    STRUCTURED_PROMPT = (
+        " Context doesn't contain direct answer, LLM reasoning is needed.Use the details and check internal LLM knowledge to find the answer. "
+        "Analyze context and question several times to localize the city, then university, then institute, then street name. "
+        "Put all your reasoning in the reasoning field, then write the street name alone, as a single word, in the answer field."
+    )
 
     def read_txt_files(self):
         texts = []
@@ -56,78 +139,102 @@ class Answerer:
                     texts.append(file.read())
         return texts
 
+    @traced()
     async def build_common_context(self, texts):
-        # Use the LLM to build a common context from the texts
+        # Use the LLM to build a common context from the texts, in window-sized groups so nothing is cut off
+        builder = ContextBuilder(self.gateway, "Translate all files in english. Add content of the files as they are")
         try:
-            response = await self.client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": "Translate all files in english. Add content of the files as they are"},
-                    {"role": "user", "content": " ".join(texts)},
-                ],
-                model='gpt-4o',
-                max_tokens=2000
-            )
-            return response.choices[0].message.content.strip()
+            return await builder.build(texts)
         except Exception as e:
             print(f"Error using LLM to build context: {e}")
             return "Error in building context."
 
+    @traced()
     async def answer_question(self, context, question):
         # Use the LLM to answer the question based on the context
         try:
-            response = await self.client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": " Context doesn't contain direct answer, LLM reasoning is needed.Use the details and check internal LLM knowledge to find the answer. Analyze context and question several times to localize the city, then university, then institute, then street name.Describe all your reasoning. Thirst think at loud then write the answer."},
-                    {"role": "user", "content": context},
-                    {"role": "user", "content": question},
-                ],
-                model='gpt-4o',
-                max_tokens=1000
+            return await self.gateway.acomplete(
+                " Context doesn't contain direct answer, LLM reasoning is needed.Use the details and check internal LLM knowledge to find the answer. Analyze context and question several times to localize the city, then university, then institute, then street name.Describe all your reasoning. Thirst think at loud then write the answer.",
+                context, question, max_tokens=1000
             )
-            return response.choices[0].message.content.strip()
         except Exception as e:
             print(f"Error using LLM to answer question: {e}")
             return "Error in answering question."
 
+    @traced()
     async def extract_question(self, system_prompt, context, question):
         # Use the LLM to answer the question based on the context
         try:
-            response = await self.client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": context},
-                    {"role": "user", "content": question},
-                ],
+            return await self.gateway.acomplete(system_prompt, context, question, max_tokens=1000)
+        except Exception as e:
+            print(f"Error using LLM to answer question: {e}")
+            return "Error in answering question."
+
+    @traced()
+    async def answer_structured(self, context, question):
+        # One call returns both the reasoning and the single-word answer
+        try:
+            response = await self.gateway.achat(
+                messages=self.gateway.messages(self.STRUCTURED_PROMPT, [context, question]),
                 model='gpt-4o',
+                response_format={
+                    "type": "json_schema",
+                    "json_schema": {
+                        "name": "answer",
+                        "strict": True,
+                        "schema": {
+                            "type": "object",
+                            "properties": {
+                                "reasoning": {"type": "string"},
+                                "answer": {"type": "string"},
+                            },
+                            "required": ["reasoning", "answer"],
+                            "additionalProperties": False,
+                        },
+                    },
+                },
                 max_tokens=1000
             )
-            return response.choices[0].message.content.strip()
+            return json.loads(response.choices[0].message.content)
         except Exception as e:
             print(f"Error using LLM to answer question: {e}")
-            return "Error in answering question."
+            return {"reasoning": "", "answer": "Error in answering question."}
+
+    @traced()
+    async def run_pipeline(self, question):
+        # Read, build the context and answer in a single event loop
+        texts = await asyncio.to_thread(self.read_txt_files)
+        context = await self.build_common_context(texts)
+        result = await self.answer_structured(context, question)
+        print("Reasoning:", result["reasoning"])
+        return result["answer"].strip()
 
 class ReportSender:
-    def __init__(self, api_key):
+    def __init__(self, api_key, report_url=None):
         self.api_key = api_key
         #ADD URL !!!
-        self.report_url = "HERE URL TO THE REPORT API"
+        self.report_url = report_url or "HERE URL TO THE REPORT API"
 
+    @traced()
     def send_report(self, answer):
         # Ensure the answer is a single word
-        answer = answer.split()[0]
+        words = answer.split()
+        answer = words[0] if words else answer
         json_structure = {
             "task": "mp3",
             "apikey": self.api_key,
             "answer": answer
         }
+        response = None
         try:
-            response = requests.post(self.report_url, json=json_structure)
+            response = get_client().post(self.report_url, json=json_structure)
             response.raise_for_status()
             print("Report sent successfully.")
             print("Response:", response.text)
         except Exception as e:
             print(f"Error sending report: {e}")
-            print("Response:", response.text)
+            if response is not None:
+                print("Response:", response.text)
 
 if __name__ == "__main__":
     
@@ -142,15 +249,12 @@ if __name__ == "__main__":
     api_key = os.environ.get("OPENAI_API_KEY")
     answerer = Answerer(directory, api_key)
     report_api_key = os.environ.get("REPORT_API_KEY")
-    # Read text files and build context
-    texts = answerer.read_txt_files()
-    context = asyncio.run(answerer.build_common_context(texts))
-    # Answer the prompt question
+    # Read text files, build context and answer the prompt question in one pass
     question = "Write the name of the street, where the institute is located, where the professor teaches."
-    answer = asyncio.run(answerer.answer_question(context, question))
-    single_word_answer = asyncio.run(answerer.extract_question("Extract single word answer from the context", answer, "What is the street name?"))
+    single_word_answer = asyncio.run(answerer.run_pipeline(question))
     print("Answer:", single_word_answer)
 
     # Send the answer as a report
     report_sender = ReportSender(report_api_key)
-    report_sender.send_report(single_word_answer)
\ No newline at end of file
+    report_sender.send_report(single_word_answer)
+    get_tracer().print_summary()
\ No newline at end of file
@@ -1,114 +1,138 @@
 import os
 import asyncio
 from PIL import Image
-from openai import AsyncOpenAI # Assuming OpenAI provides the GPT-4o Vision API
-import base64
+from modules.RateLimiter import RateLimiter
+from modules.ImagePreprocessor import ImagePreprocessor
+from modules.ImageDedup import ImageDeduplicator
+from modules.ContextBuilder import ContextBuilder
+from modules.LlmGateway import get_gateway
+from modules.Tracing import get_tracer, traced
 
 class ImageRecognizer:
-    def __init__(self, api_key, directory_path):
+    # Rough vision cost of one high-detail image, used for the tokens-per-minute budget
+    IMAGE_TOKENS_ESTIMATE = 1105
+
+    def __init__(self, api_key, directory_path, concurrency=4, requests_per_minute=None, tokens_per_minute=None, max_tokens=2000,
+                 descriptions_file_path=r'HERE PATH TO THE DESCRIPTIONS FILE', preprocessor=None, deduplicator=None, dedupe=True):
         self.api_key = api_key
         self.directory_path = directory_path
-        self.client = AsyncOpenAI(api_key=api_key)
+        self.gateway = get_gateway(api_key=api_key, cache_dir=os.path.join(directory_path, "temp"))
+        self.concurrency = concurrency
+        self.max_tokens = max_tokens
+        self.rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        # Downscale and recompress before upload; pass ImagePreprocessor(detail="high", max_edge=4096) to keep full size
+        self.preprocessor = preprocessor or ImagePreprocessor()
+        # Resized or re-encoded copies of one image share a single vision call
+        self.deduplicator = (deduplicator or ImageDeduplicator()) if dedupe else None
+        #ADD PATH TO THE DESCRIPTIONS FILE !!!
+        self.descriptions_file_path = descriptions_file_path
+
+    @traced()
+    async def recognize_image(self, file_name, semaphore):
+        file_path = os.path.join(self.directory_path, file_name)
 
+        # Resize, recompress and encode the image in base64 off the event loop
+        image = await asyncio.to_thread(self.preprocessor.prepare, file_path)
+
+        image_tokens = image["stats"]["tokens"] if image["stats"] else self.IMAGE_TOKENS_ESTIMATE
+        estimated_tokens = image_tokens + self.max_tokens
+        async with semaphore:
+            await self.rate_limiter.acquire(estimated_tokens)
+            # Call the GPT-4o Vision API
+            response = await self.gateway.achat(
+                model="gpt-4o",
+                messages=[
+                    {
+                        "role": "user",
+                        "content": [
+                            {"type": "text", "text": "What’s in this image? Focus on: geography, intersections of the streets, road numbers, landmarks addresses."},
+                            {
+                                "type": "image_url",
+                                "image_url": {
+                                    "url": image["data_url"],
+                                    "detail": image["detail"],
+                                },
+                            },
+                        ],
+                    }
+                ],
+                max_tokens=self.max_tokens,
+            )
+        usage = getattr(response, "usage", None)
+        self.rate_limiter.settle(estimated_tokens, usage.total_tokens if usage else None)
+
+        # Process the response
+        return response.choices[0].message.content.strip()
+
+    @traced()
     async def recognize_images(self):
         # List all .png files in the directory
         png_files = [f for f in os.listdir(self.directory_path) if f.endswith('.png')]
-        descriptions = []  # Collect descriptions here
-        
-        for file_name in png_files:
-            file_path = os.path.join(self.directory_path, file_name)
-            
-            # Open the image file and encode it in base64
-            with open(file_path, "rb") as image_file:
-                base64_image = base64.b64encode(image_file.read()).decode('utf-8')
-                
-                # Call the GPT-4o Vision API
-                response = await self.client.chat.completions.create(
-                    model="gpt-4o",
-                    messages=[
-                        {
-                            "role": "user",
-                            "content": [
-                                {"type": "text", "text": "What’s in this image? Focus on: geography, intersections of the streets, road numbers, landmarks addresses."},
-                                {
-                                    "type": "image_url",
-                                    "image_url": {
-                                        "url": f"data:image/png;base64,{base64_image}"
-                                    },
-                                },
-                            ],
-                        }
-                    ],
-                    max_tokens=2000,
-                )
-                
-                # Process the response
-                description = response.choices[0].message.content.strip() 
-                descriptions.append("Results for " + str(file_name) + ": " + str(description))
-        
+
+        # Only one file per group of near-identical images is sent, its description is reused for the rest
+        representatives = {file_name: file_name for file_name in png_files}
+        if self.deduplicator:
+            paths = {os.path.join(self.directory_path, file_name): file_name for file_name in png_files}
+            clusters = await asyncio.to_thread(self.deduplicator.cluster, paths)
+            representatives = {paths[copy]: paths[path] for path, copies in clusters.items() for copy in copies}
+        unique_files = list(dict.fromkeys(representatives[file_name] for file_name in png_files))
+
+        # Fan out the vision calls; gather keeps the results in file order
+        semaphore = asyncio.Semaphore(max(1, self.concurrency))
+        results = await asyncio.gather(
+            *(self.recognize_image(file_name, semaphore) for file_name in unique_files)
+        )
+        results = dict(zip(unique_files, results))
+        descriptions = ["Results for " + str(file_name) + ": " + str(results[representatives[file_name]])
+                        for file_name in png_files]
+
+        self.preprocessor.report()
+        if self.deduplicator:
+            self.deduplicator.report()
+
         # Save descriptions to a text file
         descriptions_text = " ".join(descriptions)
-        
-        #ADD PATH TO THE DESCRIPTIONS FILE !!!  
-        
-        descriptions_file_path = r'HERE PATH TO THE DESCRIPTIONS FILE'
-        with open(descriptions_file_path, "w") as text_file:
+
+        with open(self.descriptions_file_path, "w") as text_file:
             text_file.write(descriptions_text)
-        
-        return descriptions_file_path  # Return the path to the descriptions file
+
+        return self.descriptions_file_path  # Return the path to the descriptions file
 
 class Answerer:
-    def __init__(self, directory, api_key):
+    def __init__(self, directory, api_key, gateway=None):
         self.directory = directory
-        self.client = AsyncOpenAI(api_key=api_key)
+        self.gateway = gateway or get_gateway(api_key=api_key, cache_dir=os.path.join(directory, "temp"))
 
     
+    @traced()
     async def build_common_context(self, texts):
-        # Use the LLM to build a common context from the images
+        # Use the LLM to build a common context from the images, in window-sized groups so nothing is cut off
+        if isinstance(texts, str):
+            texts = [texts]
+        builder = ContextBuilder(self.gateway, " Add text files content as they are.")
         try:
-            response = await self.client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": " Add text files content as they are."},
-                    {"role": "user", "content": " ".join(texts)},
-                ],
-                model='gpt-4o',
-                max_tokens=2000
-            )
-            return response.choices[0].message.content.strip()
+            return await builder.build(texts)
         except Exception as e:
             print(f"Error using LLM to build context: {e}")
             return "Error in building context."
 
+    @traced()
     async def answer_question(self, context, question):
         # Use the LLM to answer the question based on the context
         try:
-            response = await self.client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": "You are an expert at Polish geography. Focus on streets names, road numers, and building locations. Describe all your reasoning at loud before writing the answer. One image is incorrect, please ignore it. Perform several iterations which city contains alle the streets needed. "},
-                    {"role": "user", "content": context},
-                    {"role": "user", "content": question},
-                ],
-                model='gpt-4o',
-                max_tokens=2000
+            return await self.gateway.acomplete(
+                "You are an expert at Polish geography. Focus on streets names, road numers, and building locations. Describe all your reasoning at loud before writing the answer. One image is incorrect, please ignore it. Perform several iterations which city contains alle the streets needed. ",
+                context, question, max_tokens=2000
             )
-            return response.choices[0].message.content.strip()
         except Exception as e:
             print(f"Error using LLM to answer question: {e}")
             return "Error in answering question."
 
+    @traced()
     async def extract_question(self, system_prompt, context, question):
         # Use the LLM to answer the question based on the context
         try:
-            response = await self.client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": context},
-                    {"role": "user", "content": question},
-                ],
-                model='gpt-4o',
-                max_tokens=1000
-            )
-            return response.choices[0].message.content.strip()
+            return await self.gateway.acomplete(system_prompt, context, question, max_tokens=1000)
         except Exception as e:
             print(f"Error using LLM to answer question: {e}")
             return "Error in answering question."
@@ -138,5 +162,6 @@ if __name__ == "__main__":
     question = "What city is on the images?"
     answer = asyncio.run(answerer.answer_question(image_descriptions, question))
     print(answer)
+    get_tracer().print_summary()
     # single_word_answer = asyncio.run(answerer.extract_question("Extract single word answer from the context", answer, "Write the name of city"))
     # print("Answer:", single_word_answer)
@@ -1,13 +1,15 @@
 import os
-import requests
+from modules.HttpClient import get_client
+from modules.Tracing import get_tracer, traced
 from openai import OpenAI
 
 class PromptReader:
     def __init__(self, url):
         self.url = url
 
+    @traced()
     def get_prompt(self):
-        response = requests.get(self.url)
+        response = get_client().get(self.url)
         response.raise_for_status()  # Raise an error for bad responses
         data = response.json()
         return data.get('description', '')
@@ -16,6 +18,7 @@ class ImageGenerator:
     def __init__(self, client):
         self.client = client
 
+    @traced()
     def generate_image(self, prompt):
         response = self.client.images.generate(
             model="dall-e-3",
@@ -27,12 +30,13 @@ class ImageGenerator:
         return response.data[0].url
 
 class ReportSender:
-    def __init__(self, api_key):
+    def __init__(self, api_key, report_url=None):
         self.api_key = api_key
         
         #ADD URL !!!
-        self.report_url = "HERE URL TO THE REPORT API"
+        self.report_url = report_url or "HERE URL TO THE REPORT API"
 
+    @traced()
     def send_report(self, answer):
         # Ensure the answer is a single word
         answer = answer.split()[0]
@@ -41,30 +45,37 @@ class ReportSender:
             "apikey": self.api_key,
             "answer": answer
         }
+        response = None
         try:
-            response = requests.post(self.report_url, json=json_structure)
+            response = get_client().post(self.report_url, json=json_structure)
             response.raise_for_status()
             print("Report sent successfully.")
             print("Response:", response.text)
         except Exception as e:
             print(f"Error sending report: {e}")
-            print("Response:", response.text)
+            if response is not None:
+                print("Response:", response.text)
+
+def main(prompt_url=None, report_url=None):
+    # Usage
+    api_key = os.environ.get("OPENAI_API_KEY")
+    report_api_key = os.environ.get("REPORT_API_KEY")
 
-# Usage
-api_key = os.environ.get("OPENAI_API_KEY")
-report_api_key = os.environ.get("REPORT_API_KEY")
-# Usage
+    #ADD URL !!!
+    prompt_reader = PromptReader(prompt_url or f"https://URL/data/{report_api_key}/robotid.json")
 
-#ADD URL !!!
-prompt_reader = PromptReader(f"https://URL/data/{report_api_key}/robotid.json")
+    prompt = prompt_reader.get_prompt()
+    print(prompt)
+    client = OpenAI(api_key=api_key)
+    image_generator = ImageGenerator(client)
+    image_url = image_generator.generate_image(prompt)
+    print(image_url)
 
-prompt = prompt_reader.get_prompt()
-print(prompt)
-client = OpenAI(api_key=api_key)
-image_generator = ImageGenerator(client)
-image_url = image_generator.generate_image(prompt)
-print(image_url)
+    # Send the answer as a report
+    report_sender = ReportSender(report_api_key, report_url)
+    report_sender.send_report(image_url)
+    get_tracer().print_summary()
+    return image_url
 
-# Send the answer as a report
-report_sender = ReportSender(report_api_key)
-report_sender.send_report(image_url)
+if __name__ == "__main__":
+    main()
@@ -2,34 +2,76 @@ import os
 import requests
 import sys
 sys.path.append("C:\\Users\\kamyk\\Documents\\01_PROJECTS\\AI_DEVS_3")
-from bs4 import BeautifulSoup
 import json
-from openai import OpenAI
-from urllib.parse import  urljoin
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import FAISS
-from langchain_openai.chat_models import ChatOpenAI
-from langchain_openai.embeddings import OpenAIEmbeddings
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough
-from langchain_core.documents import Document
-from langchain_core.prompts import ChatPromptTemplate
-from langchain import hub
+import asyncio
+import threading
+import hashlib
+import pickle
+import contextlib
+import contextvars
+import functools
+from urllib.parse import  urljoin, urldefrag, urlsplit, urlunsplit
+from concurrent.futures import Future, ThreadPoolExecutor
+from collections import deque
+from html.parser import HTMLParser
 from dotenv import load_dotenv
-from modules.ImageRecognizer import ImageRecognizer
-from modules.Transcriber import Transcriber
 from modules.Responder import ReportSenderAnswerJson
+from modules.DiskCache import DiskCache
+from modules.HttpClient import get_client
+from modules.Retry import map_concurrently
+from modules.TokenCounter import count_tokens
+from modules.LlmGateway import get_gateway
+from modules.Tracing import get_tracer, traced
+# Ciężkie zależności (LangChain, FAISS, numpy, PIL, bs4, openai) importowane są w metodach,
+# które ich używają, więc ścieżka SimpleAnswerer startuje bez nich
 
 
 
 class Utils:
 
+    # Chroni leniwe tworzenie wspólnych obiektów, bo pierwsze wywołania przychodzą naraz z puli wątków
+    lock = threading.Lock()
+
+    # Wspólny dla wszystkich obrazów, żeby sumować oszczędności z całego przebiegu
+    image_preprocessor = None
+
+    # Kopie tego samego obrazu (przeskalowane, przekompresowane) dostają jeden opis w obrębie przebiegu;
+    # grupy są czyszczone na końcu index_webpage_stream i crawl, sumy zostają do raportu
+    image_deduplicator = None
+
+    @staticmethod
+    def get_image_preprocessor():
+        with Utils.lock:
+            if Utils.image_preprocessor is None:
+                from modules.ImagePreprocessor import ImagePreprocessor
+                Utils.image_preprocessor = ImagePreprocessor()
+            return Utils.image_preprocessor
+
+    # Wspólny detektor mowy, żeby sumować usuniętą ciszę z całego przebiegu
+    voice_activity = None
+
+    @staticmethod
+    def get_voice_activity():
+        with Utils.lock:
+            if Utils.voice_activity is None:
+                from modules.VoiceActivity import VoiceActivityDetector
+                Utils.voice_activity = VoiceActivityDetector()
+            return Utils.voice_activity
+
+    @staticmethod
+    def get_image_deduplicator():
+        with Utils.lock:
+            if Utils.image_deduplicator is None:
+                from modules.ImageDedup import ImageDeduplicator
+                Utils.image_deduplicator = ImageDeduplicator()
+            return Utils.image_deduplicator
            
     @staticmethod
     def fetch_webpage(url):
         """Pobiera stronę internetową i zwraca obiekt BeautifulSoup."""
+        from bs4 import BeautifulSoup
         try:
-            response = requests.get(url)
+            response = get_client().get(url)
             response.raise_for_status()  # Sprawdza, czy nie wystąpił błąd HTTP
             soup = BeautifulSoup(response.content, 'html.parser')
             return soup
@@ -38,119 +80,607 @@ class Utils:
             return None
 
     @staticmethod
-    def save_file(url, folder):
-        """Pobiera plik z URL-a i zapisuje go lokalnie."""
+    @traced("fetch")
+    def open_webpage(url):
+        """Otwiera stronę w trybie strumieniowym i zwraca odpowiedź HTTP."""
         try:
-            response = requests.get(url)
+            response = get_client().get(url, stream=True)
             response.raise_for_status()
-            file_name = os.path.basename(url)
-            file_path = os.path.join(folder, file_name)
-            os.makedirs(folder, exist_ok=True)
-            with open(file_path, 'wb') as file:
-                file.write(response.content)
+            # Bez charset w nagłówku requests przyjmuje ISO-8859-1
+            if 'charset' not in response.headers.get('Content-Type', '').lower():
+                response.encoding = 'utf-8'
+            return response
+        except requests.RequestException as e:
+            print(f"Error fetching webpage: {e}")
+            return None
+
+    @staticmethod
+    def split_stream(parts, text_splitter, buffer_size=20000):
+        """Dzieli strumień tekstu na fragmenty bez składania całego tekstu w pamięci."""
+        buffer = []
+        size = 0
+        for part in parts:
+            buffer.append(part)
+            size += len(part)
+            if size >= buffer_size:
+                text = "".join(buffer)
+                chunks = text_splitter.split_text(text)
+                yield from chunks[:-1]
+                # Ostatni fragment może być ucięty, więc zaczyna następny bufor; brany jest surowy koniec tekstu,
+                # bo split_text obcina białe znaki i następny kawałek przykleiłby się do ostatniego słowa
+                start = text.rfind(chunks[-1]) if chunks else len(text)
+                buffer = [text[start:] if start >= 0 else chunks[-1] + "\n"]
+                size = len(buffer[0])
+        if buffer:
+            yield from text_splitter.split_text("".join(buffer))
+
+    @staticmethod
+    def media_path(url, folder):
+        """Zwraca ścieżkę pliku dla URL-a: skrót URL-a plus rozszerzenie, więc /a/1.png i /b/1.png się nie nadpisują."""
+        extension = os.path.splitext(urlsplit(url).path)[1]
+        return os.path.join(folder, hashlib.sha256(url.encode('utf-8')).hexdigest()[:16] + extension)
+
+    @staticmethod
+    @traced("download")
+    def save_file(url, folder, cache=None, max_bytes=100 * 1024 * 1024):
+        """Pobiera plik z URL-a i zapisuje go lokalnie.
+
+        Z podanym cache wysyła warunkowe GET (ETag/Last-Modified) i nie pobiera
+        ponownie pliku, który się nie zmienił.
+        """
+        file_path = Utils.media_path(url, folder)
+        headers = {}
+        validators = cache.get_validators(url) if cache else None
+        # 304 potwierdza tylko wersję na serwerze, więc plik na dysku musi być tym pobranym wtedy
+        if (validators and validators["path"] == file_path and os.path.exists(file_path)
+                and validators["digest"] == DiskCache.file_digest(file_path)):
+            if validators["etag"]:
+                headers["If-None-Match"] = validators["etag"]
+            if validators["last_modified"]:
+                headers["If-Modified-Since"] = validators["last_modified"]
+        try:
+            response = get_client().download(url, file_path, headers=headers, max_bytes=max_bytes)
+            if response.status_code == 304:
+                print(f"File not modified, using {file_path}")
+                return file_path
+            if cache:
+                cache.set_validators(url, file_path, response.headers.get("ETag"), response.headers.get("Last-Modified"),
+                                     DiskCache.file_digest(file_path))
             print(f"File saved to {file_path}")
+            return file_path
         except requests.RequestException as e:
             print(f"Error downloading file: {e}")
+            return None
 
     @staticmethod
-    def get_cached_or_generate_description(client, image_path, cache_dir):
+    @traced("vision")
+    def get_cached_or_generate_description(client, image_path, cache_dir, model="gpt-4o", prompt="Opisz co widzisz na obrazie", max_tokens=1000):
         """Zwraca opis obrazu z cache lub generuje nowy opis."""
-        cache_file = os.path.join(cache_dir, f"{os.path.basename(image_path)}.txt")
-        if os.path.exists(cache_file):
-            with open(cache_file, 'r') as file:
-                return file.read()
-        
-        image_recognizer = ImageRecognizer(client)
-        description = image_recognizer.recognize_image( image_path, 1000, "Opisz co widzisz na obrazie", "gpt-4o")
-        
-        os.makedirs(cache_dir, exist_ok=True)
-        with open(cache_file, 'w') as file:
-            file.write(description)
-        
+        from modules.ImageRecognizer import ImageRecognizer
+        cache = DiskCache.open(cache_dir)
+        key = DiskCache.make_key("description", DiskCache.file_digest(image_path), model, prompt, max_tokens,
+                                 Utils.get_image_preprocessor().cache_key())
+        description = cache.get(key)
+        if description is not None:
+            return description
+
+        # Kopia obrazu już opisywanego w tym przebiegu czeka na tamten opis zamiast wysyłać własny
+        future, leader = Utils.get_image_deduplicator().claim(image_path, scope=(model, prompt, max_tokens))
+        if not leader:
+            try:
+                description = future.result()
+            except Exception as e:
+                print(f"Description of a similar image failed ({e}), describing {image_path}")
+        if description is None:
+            try:
+                image_recognizer = ImageRecognizer(client, Utils.get_image_preprocessor())
+                description = image_recognizer.recognize_image(image_path, max_tokens, prompt, model)
+            except Exception as e:
+                if leader:
+                    future.set_exception(e)
+                raise
+            if leader:
+                future.set_result(description)
+
+        cache.put(key, description)
         return description
 
     @staticmethod
-    def get_cached_or_transcribe_audio(client, audio_path, cache_dir):
+    @traced("transcription")
+    def get_cached_or_transcribe_audio(client, audio_path, cache_dir, model="whisper-1", language="pl"):
         """Zwraca transkrypcję audio z cache lub generuje nową transkrypcję."""
-        cache_file = os.path.join(cache_dir, f"{os.path.basename(audio_path)}.txt")
-        if os.path.exists(cache_file):
-            with open(cache_file, 'r') as file:
-                return file.read()
-        
-        transcriber = Transcriber(client)
-        transcription = transcriber.transcribe(audio_path)
-        
-        os.makedirs(cache_dir, exist_ok=True)
-        with open(cache_file, 'w') as file:
-            file.write(transcription)
+        from modules.Transcriber import Transcriber
+        cache = DiskCache.open(cache_dir)
+        key = DiskCache.make_key("transcription", DiskCache.file_digest(audio_path), model, language,
+                                 Utils.get_voice_activity().cache_key())
+        transcription = cache.get(key)
+        if transcription is not None:
+            return transcription
+
+        # Cisza jest wycinana przed wysłaniem, a fragmenty mowy idą do Whispera równolegle
+        transcriber = Transcriber(client, vad=Utils.get_voice_activity())
+        transcription = transcriber.transcribe(audio_path, language)
         
+        cache.put(key, transcription)
         return transcription
 
+class HtmlSegmentParser(HTMLParser):
+    """Przyrostowy parser HTML zbierający tekst, obrazy, audio i linki w kolejności dokumentu."""
+
+    def __init__(self, url):
+        super().__init__(convert_charrefs=True)
+        self.url = url
+        self.segments = []
+        # Węzeł tekstowy przychodzi w kawałkach na granicach feed(), więc jest sklejany do następnego znacznika
+        self.text = []
+
+    def flush_text(self):
+        if self.text:
+            self.segments.append(('text', "".join(self.text).strip()))
+            self.text = []
+
+    def handle_starttag(self, tag, attrs):
+        self.flush_text()
+        attrs = dict(attrs)
+        if tag == 'img' and attrs.get('src'):  # Obraz
+            self.segments.append(('image', urljoin(self.url, attrs['src'])))
+        elif tag == 'source' and attrs.get('type') == 'audio/mpeg' and attrs.get('src'):  # Audio
+            self.segments.append(('audio', urljoin(self.url, attrs['src'])))
+        elif tag == 'a' and attrs.get('href'):  # Link, dla crawlera
+            self.segments.append(('link', urljoin(self.url, attrs['href'])))
+
+    def handle_endtag(self, tag):
+        self.flush_text()
+
+    def handle_data(self, data):  # Tekst
+        self.text.append(data)
+
+    def close(self):
+        super().close()
+        self.flush_text()
+
+    def pop_segments(self):
+        segments = self.segments
+        self.segments = []
+        return segments
+
+
 class IndexHtml:
     
-    def __init__(self, client):
+    def __init__(self, client, download_workers=8, processing_workers=4, per_host=None):
         self.client = client
+        self.download_workers = download_workers
+        self.processing_workers = processing_workers
+        # Limit równoczesnych pobrań z jednego hosta (strony i media razem); None to brak limitu
+        self.per_host = per_host
+        self.host_slots = {}
+        # Chroni słownik mediów i limity hostów, gdy kilka stron (crawler) dzieli te same pule
+        self.media_lock = threading.Lock()
+        # URL-e mediów, których nie udało się opisać; w tekście zostaje po nich pusta linia
+        self.failed_media = []
 
-    def index_webpage(self, url, dir):
-        # Pobierz stronę
-        soup = Utils.fetch_webpage(url)
-        if not soup:
-            return "Failed to fetch webpage."
-
-        # Tworzenie folderów
-        image_folder = os.path.join(dir, r'temp\images')
-        audio_folder = os.path.join(dir, r'temp\audio')
-        os.makedirs(image_folder, exist_ok=True)
-        os.makedirs(audio_folder, exist_ok=True)
-
-        # Inicjalizacja text_content
-        text_content = ""
-
-        # Rekurencyjne przetwarzanie HTML
-        for element in soup.descendants:
-            if element.name is None:  # Tekst
-                text_content += element.strip() + "\n"
-            elif element.name == 'img' and element.get('src'):  # Obraz
-                image_url = urljoin(url, element['src'])
-                Utils.save_file(image_url, image_folder)
-                image_path = os.path.join(image_folder, os.path.basename(image_url))
-                description = Utils.get_cached_or_generate_description(self.client, image_path, image_folder)
-                text_content += description + "\n"
-            elif element.name == 'source' and element.get('type') == 'audio/mpeg' and element.get('src'):  # Audio
-                audio_url = urljoin(url, element['src'])
-                Utils.save_file(audio_url, audio_folder)
-                audio_path = os.path.join(audio_folder, os.path.basename(audio_url))
-                transcription = Utils.get_cached_or_transcribe_audio(self.client, audio_path, audio_folder)
-                text_content += transcription + "\n"
-
-        # Zwróć pełny tekst strony
-        # Save text_content to context.txt in the specified directory        
+    def host_slot(self, url):
+        """Zwraca semafor hosta z url, zajmowany na czas pobierania."""
+        if not self.per_host:
+            return contextlib.nullcontext()
+        with self.media_lock:
+            return self.host_slots.setdefault(urlsplit(url).netloc, threading.BoundedSemaphore(self.per_host))
+
+    def download_media(self, media_url, folder, cache):
+        with self.host_slot(media_url):
+            return Utils.save_file(media_url, folder, cache)
+
+    @staticmethod
+    def iter_segments(chunks, url):
+        """Zwraca fragmenty strony (tekst, obraz, audio) w miarę napływu kolejnych kawałków HTML."""
+        parser = HtmlSegmentParser(url)
+        for chunk in chunks:
+            parser.feed(chunk)
+            yield from parser.pop_segments()
+        parser.close()
+        yield from parser.pop_segments()
+
+    def process_media(self, path, kind, cache_dir):
+        """Opisuje obraz lub transkrybuje audio zapisane pod path."""
+        if kind == 'image':
+            return Utils.get_cached_or_generate_description(self.client, path, cache_dir)
+        return Utils.get_cached_or_transcribe_audio(self.client, path, cache_dir)
+
+    def submit_media(self, media_url, kind, folder, cache_dir, download_pool, processing_pool):
+        """Pobiera plik w puli pobierania, a po pobraniu przekazuje go do puli opisu."""
+        result = Future()
+
+        def on_processed(processing):
+            if processing.exception():
+                print(f"Error processing {media_url}: {processing.exception()}")
+                with self.media_lock:
+                    self.failed_media.append(media_url)
+                result.set_result("")
+            else:
+                result.set_result(processing.result())
+
+        def on_downloaded(download):
+            # Nawet po błędzie pobierania opis może być w cache, jeśli plik został z poprzedniego przebiegu
+            path = None if download.exception() else download.result()
+            path = path or Utils.media_path(media_url, folder)
+            processing_pool.submit(self.process_media, path, kind, cache_dir).add_done_callback(on_processed)
+
+        cache = DiskCache.open(cache_dir)
+        download_pool.submit(self.download_media, media_url, folder, cache).add_done_callback(on_downloaded)
+        return result
+
+    @staticmethod
+    def make_folders(dir):
+        """Tworzy katalog temp z podkatalogami na media i zwraca (temp_dir, {rodzaj: folder})."""
         temp_dir = os.path.join(dir, 'temp')
-        os.makedirs(temp_dir, exist_ok=True)
+        folders = {'image': os.path.join(dir, r'temp\images'), 'audio': os.path.join(dir, r'temp\audio')}
+        for folder in [temp_dir, *folders.values()]:
+            os.makedirs(folder, exist_ok=True)
+        return temp_dir, folders
+
+    def extract_stream(self, segments, folders, temp_dir, download_pool, processing_pool, media=None, links=None):
+        """Zwraca tekst z fragmentów strony w kolejności dokumentu, a media opisuje w pulach w tle."""
+        media = {} if media is None else media
+        pending = deque()
+        for kind, value in segments:
+            if kind == 'link':
+                if links is not None:
+                    links.append(value)
+                continue
+            if kind == 'text':
+                pending.append(value)
+                # Tekst przed pierwszym nieukończonym medium można już zwrócić
+                while pending and (isinstance(pending[0], str) or pending[0].done()):
+                    part = pending.popleft()
+                    yield (part if isinstance(part, str) else part.result()) + "\n"
+                continue
+            # Media startują od razu; wynik trafia na swoje miejsce w kolejności dokumentu
+            with self.media_lock:
+                if value not in media:
+                    media[value] = self.submit_media(value, kind, folders[kind], temp_dir, download_pool, processing_pool)
+            pending.append(media[value])
+
+        while pending:
+            part = pending.popleft()
+            yield (part if isinstance(part, str) else part.result()) + "\n"
+
+    def index_webpage_stream(self, url, dir):
+        """Zwraca tekst strony kawałkami w kolejności dokumentu, zapisując go na bieżąco do context.txt."""
+        # Pobierz stronę
+        response = Utils.open_webpage(url)
+        if response is None:
+            yield "Failed to fetch webpage."
+            return
+
+        temp_dir, folders = self.make_folders(dir)
         context_file_path = os.path.join(temp_dir, 'context.txt')
-        
-        with open(context_file_path, 'w', encoding='utf-8') as file:
-            file.write(text_content)
-            
-        return text_content
 
+        # Pula opisu zamykana jest ostatnia, bo zakończone pobrania dokładają do niej zadania
+        try:
+            with ThreadPoolExecutor(max_workers=self.processing_workers) as processing_pool, \
+                    ThreadPoolExecutor(max_workers=self.download_workers) as download_pool, \
+                    open(context_file_path, 'w', encoding='utf-8') as file:
+                chunks = response.iter_content(chunk_size=64 * 1024, decode_unicode=True)
+                for part in self.extract_stream(self.iter_segments(chunks, url), folders, temp_dir,
+                                                download_pool, processing_pool):
+                    file.write(part)
+                    yield part
+        finally:
+            # Opisy z tego przebiegu nie mogą trafić do stron z innego katalogu bez sprawdzenia cache
+            Utils.get_image_deduplicator().clear()
+        print(f"Media cache: {DiskCache.open(temp_dir).stats()}")
+        Utils.get_image_preprocessor().report()
+        Utils.get_image_deduplicator().report()
+        if Utils.voice_activity is not None:
+            Utils.voice_activity.report()
+
+    @traced()
+    def index_webpage(self, url, dir):
+        # Zwróć pełny tekst strony (zapisany też do context.txt w katalogu temp)
+        return "".join(self.index_webpage_stream(url, dir))
+
+
+
+class SiteCrawler:
+    """Asynchroniczny crawler: od strony startowej po linkach w obrębie tego samego hosta.
+
+    Każda strona przechodzi przez tę samą ekstrakcję tekstu, obrazów i audio
+    co IndexHtml; wynikiem jest jeden wspólny kontekst i lista stron z
+    informacją, skąd pochodzi każdy fragment.
+    """
+
+    def __init__(self, index_html, max_depth=2, max_pages=50, max_concurrency=8, per_host=4, timeout=30):
+        self.index_html = index_html
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.max_concurrency = max_concurrency
+        # Limit hosta obejmuje też pobrania mediów, więc trzyma go IndexHtml
+        index_html.per_host = per_host
+        self.timeout = timeout
+        self.stats = {"pages": 0, "duplicate_urls": 0, "duplicate_bodies": 0, "skipped": 0, "errors": 0}
+
+    @staticmethod
+    def normalize_url(url):
+        """Usuwa fragment (#...) i ujednolica schemat oraz host, żeby ten sam adres nie był pobierany dwa razy."""
+        parts = urlsplit(urldefrag(url)[0])
+        return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', parts.query, ''))
+
+    @traced("fetch")
+    def fetch_page(self, url):
+        """Pobiera stronę; zwraca jej HTML albo None, jeśli to nie jest HTML."""
+        with self.index_html.host_slot(url), get_client().get(url, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            content_type = response.headers.get('Content-Type', '').lower()
+            if 'html' not in content_type:
+                return None
+            # Bez charset w nagłówku requests przyjmuje ISO-8859-1
+            if 'charset' not in content_type:
+                response.encoding = 'utf-8'
+            return response.text
+
+    def index_page(self, html, url, folders, temp_dir, download_pool, processing_pool, media):
+        """Zwraca (tekst strony z opisami mediów, linki ze strony)."""
+        links = []
+        segments = IndexHtml.iter_segments([html], url)
+        text = "".join(self.index_html.extract_stream(segments, folders, temp_dir, download_pool, processing_pool,
+                                                      media, links))
+        return text, links
+
+    @staticmethod
+    def merge_pages(pages):
+        """Skleja teksty stron w kolejności odkrycia i zapisuje w każdej stronie jej zakres w kontekście."""
+        parts = []
+        offset = 0
+        for page in pages:
+            text = page.pop('text', None)
+            if not text:
+                continue
+            part = f"Źródło: {page['url']}\n{text}\n"
+            page['start'], page['end'] = offset, offset + len(part)
+            parts.append(part)
+            offset += len(part)
+        return "".join(parts)
+
+    @traced()
+    async def crawl(self, seed_url, dir):
+        """Przechodzi serwis od seed_url; zwraca {"context": wspólny tekst, "pages": pochodzenie stron}."""
+        temp_dir, folders = IndexHtml.make_folders(dir)
+        seed_url = self.normalize_url(seed_url)
+        origin = urlsplit(seed_url)[:2]
+        bodies = {}
+        media = {}
+        # Strony w kolejności odkrycia, więc kontekst nie zależy od kolejności odpowiedzi
+        pages = [{"url": seed_url, "depth": 0, "parent": None, "status": "pending"}]
+        # URL -> strona; jej głębokość to najkrótsza dotąd znaleziona ścieżka
+        seen = {seed_url: pages[0]}
+        # Linki pobranych stron, do ponownego rozwinięcia, gdy strona okaże się płycej
+        outlinks = {}
+        queue = asyncio.Queue()
+        queue.put_nowait(pages[0])
+        loop = asyncio.get_running_loop()
+
+        def run(pool, func, *args):
+            # Kopia kontekstu, żeby spany z wątków trafiały pod span crawl
+            return loop.run_in_executor(pool, functools.partial(contextvars.copy_context().run, func, *args))
+
+        def expand(page, links):
+            if page['depth'] >= self.max_depth:
+                return
+            for link in links:
+                known = seen.get(link)
+                if known is None:
+                    if len(pages) >= self.max_pages:
+                        continue
+                    child = {"url": link, "depth": page['depth'] + 1, "parent": page['url'], "status": "pending"}
+                    seen[link] = child
+                    pages.append(child)
+                    queue.put_nowait(child)
+                elif known['depth'] > page['depth'] + 1:
+                    # Workery nie idą ściśle wszerz, więc krótsza ścieżka może się znaleźć później;
+                    # strona w kolejce po prostu dostaje mniejszą głębokość, pobrana rozwija swoje linki jeszcze raz
+                    known['depth'], known['parent'] = page['depth'] + 1, page['url']
+                    if known['url'] in outlinks:
+                        expand(known, outlinks[known['url']])
+                else:
+                    self.stats['duplicate_urls'] += 1
+
+        async def visit(page, page_pool, download_pool, processing_pool):
+            url = page['url']
+            html = await run(page_pool, self.fetch_page, url)
+            if html is None:
+                page['status'] = "skipped"
+                self.stats['skipped'] += 1
+                return
+            digest = hashlib.sha256(html.encode('utf-8')).hexdigest()
+            if digest in bodies:
+                # Ta sama treść pod innym adresem (np. /index.html i /)
+                page['status'], page['duplicate_of'] = "duplicate", bodies[digest]
+                self.stats['duplicate_bodies'] += 1
+                return
+            bodies[digest] = url
+            page['text'], links = await run(page_pool, self.index_page, html, url, folders, temp_dir,
+                                            download_pool, processing_pool, media)
+            page['status'], page['sha256'], page['links'] = "ok", digest, len(links)
+            self.stats['pages'] += 1
+
+            outlinks[url] = [link for link in map(self.normalize_url, links) if urlsplit(link)[:2] == origin]
+            expand(page, outlinks[url])
+
+        async def worker(*pools):
+            while True:
+                page = await queue.get()
+                try:
+                    await visit(page, *pools)
+                except Exception as e:
+                    print(f"Error crawling {page['url']}: {e}")
+                    page['status'], page['error'] = "error", str(e)
+                    self.stats['errors'] += 1
+                finally:
+                    queue.task_done()
+
+        # Pula opisu zamykana jest ostatnia, bo zakończone pobrania dokładają do niej zadania
+        try:
+            with ThreadPoolExecutor(max_workers=self.index_html.processing_workers) as processing_pool, \
+                    ThreadPoolExecutor(max_workers=self.index_html.download_workers) as download_pool, \
+                    ThreadPoolExecutor(max_workers=self.max_concurrency) as page_pool:
+                workers = [asyncio.create_task(worker(page_pool, download_pool, processing_pool))
+                           for _ in range(self.max_concurrency)]
+                await queue.join()
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+        finally:
+            Utils.get_image_deduplicator().clear()
+
+        context = self.merge_pages(pages)
+        with open(os.path.join(temp_dir, 'context.txt'), 'w', encoding='utf-8') as file:
+            file.write(context)
+        with open(os.path.join(temp_dir, 'provenance.json'), 'w', encoding='utf-8') as file:
+            json.dump(pages, file, ensure_ascii=False, indent=2)
+        print(f"Crawl: {self.stats}")
+        print(f"Media cache: {DiskCache.open(temp_dir).stats()}")
+        Utils.get_image_preprocessor().report()
+        Utils.get_image_deduplicator().report()
+        if Utils.voice_activity is not None:
+            Utils.voice_activity.report()
+        return {"context": context, "pages": pages}
+
+    def crawl_site(self, seed_url, dir):
+        """Synchroniczna wersja crawl, dla skryptów bez własnej pętli zdarzeń."""
+        return asyncio.run(self.crawl(seed_url, dir))
 
 
 class KnowledgeDb:
     
-    def __init__(self, api_key):
+    INDEX_FILE = "index.faiss"
+    DOCSTORE_FILE = "index.pkl"
+
+    def __init__(self, api_key, index_dir=None, embeddings=None, index_type="auto"):
         self.api_key = api_key
+        # Katalog z trwałym indeksem FAISS; bez niego indeks powstaje w pamięci
+        self.index_dir = index_dir
+        # "flat", "ivf", "hnsw", "ivfpq" lub "auto" (wybór według liczby fragmentów)
+        self.index_type = index_type
+        self.chunks = {}
+        self.retriever = None
+        # Embeddingi w partiach, z cache wektorów obok indeksu
+        if embeddings is None:
+            from openai import OpenAI
+            from modules.EmbeddingService import EmbeddingService
+            embeddings = EmbeddingService(
+                OpenAI(api_key=self.api_key),
+                cache_dir=os.path.join(index_dir, 'embeddings') if index_dir else None,
+            )
+        self.embeddings = embeddings
+
+    @staticmethod
+    def chunk_id(chunk):
+        return hashlib.sha256(chunk.encode('utf-8')).hexdigest()
 
-    def prepare_knowledge_base(self, text_content):
-        # Dzielenie tekstu na fragmenty
+    def split_chunks(self, text_content):
+        """Dzieli tekst (napis lub strumień kawałków) na fragmenty i zwraca słownik {hash fragmentu: fragment}."""
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
         text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=100)
-        text_chunks = text_splitter.split_text(text_content)
+        if isinstance(text_content, str):
+            chunks = text_splitter.split_text(text_content)
+        else:
+            chunks = Utils.split_stream(text_content, text_splitter)
+        return {self.chunk_id(chunk): chunk for chunk in chunks}
+
+    def load_vectorstore(self, mmap=False):
+        """Wczytuje indeks z dysku; tylko do odczytu przez mmap, jeśli nic się nie zmienia."""
+        import faiss
+        from langchain_community.vectorstores import FAISS
+        from modules.VectorIndex import configure_search
+        index_path = os.path.join(self.index_dir, self.INDEX_FILE)
+        index = None
+        if mmap:
+            try:
+                index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            except RuntimeError:
+                # Starsze wersje FAISS nie mapują indeksów płaskich
+                index = None
+        if index is None:
+            index = faiss.read_index(index_path)
+        configure_search(index)
+        with open(os.path.join(self.index_dir, self.DOCSTORE_FILE), 'rb') as file:
+            docstore, index_to_docstore_id = pickle.load(file)
+        return FAISS(self.embeddings, index, docstore, index_to_docstore_id)
 
-        # Tworzenie obiektów dokumentów z fragmentów tekstu
-        documents = [Document(page_content=chunk) for chunk in text_chunks]
+    def resolve_index_type(self, count):
+        from modules.VectorIndex import choose_index_type
+        return choose_index_type(count) if self.index_type == "auto" else self.index_type
 
-        # Tworzenie przestrzeni FAISS z dokumentów
-        vectorstore = FAISS.from_documents(documents=documents, embedding=OpenAIEmbeddings(api_key=self.api_key))
+    def create_vectorstore(self, chunks):
+        """Buduje indeks wybranego typu; IVF i PQ trenują się na próbce wektorów."""
+        import numpy as np
+        from langchain_community.docstore.in_memory import InMemoryDocstore
+        from langchain_community.vectorstores import FAISS
+        from modules.VectorIndex import make_index
+        texts = list(chunks.values())
+        vectors = np.asarray(self.embeddings.embed_documents(texts), dtype='float32')
+        index = make_index(self.resolve_index_type(len(texts)), vectors)
+        vectorstore = FAISS(self.embeddings, index, InMemoryDocstore(), {})
+        vectorstore.add_embeddings(zip(texts, vectors.tolist()), ids=list(chunks))
+        return vectorstore
+
+    @traced()
+    def build_vectorstore(self, text_content):
+        """Zwraca indeks FAISS, licząc embeddingi tylko dla nowych fragmentów."""
+        from modules.VectorIndex import index_type_of, supports_removal
+        chunks = self.split_chunks(text_content)
+        # Te same fragmenty trafiają do indeksu słów kluczowych w prepare_knowledge_base
+        self.chunks = chunks
+        if not self.index_dir:
+            return self.create_vectorstore(chunks)
+
+        if not os.path.exists(os.path.join(self.index_dir, self.INDEX_FILE)):
+            vectorstore = self.create_vectorstore(chunks)
+            vectorstore.save_local(self.index_dir)
+            print(f"Knowledge base built: {len(chunks)} chunks, {index_type_of(vectorstore.index)} index")
+            return vectorstore
+
+        with open(os.path.join(self.index_dir, self.DOCSTORE_FILE), 'rb') as file:
+            _, index_to_docstore_id = pickle.load(file)
+        stored_ids = set(index_to_docstore_id.values())
+        new_ids = [chunk_id for chunk_id in chunks if chunk_id not in stored_ids]
+        vanished_ids = [chunk_id for chunk_id in stored_ids if chunk_id not in chunks]
+        vectorstore = self.load_vectorstore(mmap=not new_ids and not vanished_ids)
+        stored_type = index_type_of(vectorstore.index)
+        # Inny typ dla nowego rozmiaru korpusu albo usuwanie z indeksu innego niż płaski: budowa od nowa,
+        # embeddingi niezmienionych fragmentów pochodzą z cache
+        if stored_type != self.resolve_index_type(len(chunks)) or (vanished_ids and not supports_removal(stored_type)):
+            vectorstore = self.create_vectorstore(chunks)
+            vectorstore.save_local(self.index_dir)
+            print(f"Knowledge base rebuilt: {len(chunks)} chunks, {stored_type} -> {index_type_of(vectorstore.index)} index")
+            return vectorstore
+        if not new_ids and not vanished_ids:
+            print(f"Knowledge base loaded: {len(chunks)} chunks, no changes")
+            return vectorstore
+
+        if vanished_ids:
+            vectorstore.delete(vanished_ids)
+        if new_ids:
+            vectorstore.add_texts([chunks[chunk_id] for chunk_id in new_ids], ids=new_ids)
+        vectorstore.save_local(self.index_dir)
+        print(f"Knowledge base updated: {len(new_ids)} chunks added, {len(vanished_ids)} removed")
+        return vectorstore
+
+    @traced()
+    def prepare_knowledge_base(self, text_content, k=4, hybrid=True):
+        from langchain_core.output_parsers import StrOutputParser
+        from langchain_core.prompts import ChatPromptTemplate
+        from langchain_core.runnables import RunnablePassthrough
+        from langchain_openai.chat_models import ChatOpenAI
+        from modules.HybridRetriever import HybridRetriever
+        # Tworzenie przestrzeni FAISS z fragmentów tekstu
+        vectorstore = self.build_vectorstore(text_content)
+        # BM25 + FAISS (RRF); pytania z nazwami i liczbami obchodzą się bez embeddingu zapytania
+        if hybrid:
+            retriever = HybridRetriever.from_chunks(vectorstore, self.chunks, k=k)
+        else:
+            retriever = vectorstore.as_retriever(search_kwargs={"k": k})
+        self.retriever = retriever
 
         # Tworzenie łańcucha QA
         llm = ChatOpenAI(api_key=self.api_key) 
@@ -166,7 +696,7 @@ class KnowledgeDb:
 
         qa_chain = (
             {
-                "context": vectorstore.as_retriever() | format_docs,
+                "context": retriever | format_docs,
                 "question": RunnablePassthrough(),
             }
             | prompt
@@ -185,7 +715,7 @@ class Answerer:
     def load_questions(self):
         """Pobiera pytania z URL-a i zapisuje je w słowniku."""
         try:
-            response = requests.get(self.url_question)
+            response = get_client().get(self.url_question)
             response.raise_for_status()
             questions_data = response.text.splitlines()
             questions = {}
@@ -198,6 +728,7 @@ class Answerer:
             print(f"Error fetching questions: {e}")
             return {}
 
+    @traced()
     def generate_answers(self):
         """Generuje odpowiedzi na pytania."""
         answers = {}
@@ -208,7 +739,30 @@ class Answerer:
             answer = self.qa_chain.invoke(prompt)
             answers[q_id.strip()] = answer.strip()
         return answers
+
+    @traced()
+    def generate_answers_concurrently(self, max_concurrency=8, timeout=60, retries=3):
+        """Generuje odpowiedzi równolegle, z limitem czasu i ponowieniami dla każdego pytania."""
+        print(self.questions)
+        results = asyncio.run(map_concurrently(
+            self.questions, self.qa_chain.ainvoke, max_concurrency=max_concurrency, timeout=timeout, retries=retries
+        ))
+        return Answerer.collect_answers(results)
+
+    @staticmethod
+    def collect_answers(results, errors=None):
+        """Zamienia wyniki {id: odpowiedź lub wyjątek} na słownik odpowiedzi; wyjątki trafiają też do errors."""
+        answers = {}
+        for q_id, answer in results.items():
+            if isinstance(answer, Exception):
+                print(f"Error answering question {q_id}: {answer!r}")
+                if errors is not None:
+                    errors[q_id] = answer
+                answer = "Error in answering question."
+            answers[q_id.strip()] = answer.strip()
+        return answers
     
+    @traced()
     def generate_answers_without_qa(self):
         """Generuje odpowiedzi na pytania."""
         answers = {}
@@ -222,16 +776,39 @@ class Answerer:
     
 class SimpleAnswerer:
     
-    def __init__(self, url_question, client, context):
+    SYSTEM_PROMPT = "You are an assistant for question-answering tasks. Use the following pieces of retrieved context to answer the question. Use one sentence and keep the answer concise."
+    PACKED_PROMPT = "Answer every question from the JSON list using the context above. Use one sentence per answer and keep it concise. Return the answers with the same ids."
+
+    def __init__(self, url_question, client, context, gateway=None, questions=None):
         self.client = client
+        # Wspólna bramka LLM: jedno połączenie, scalanie identycznych zapytań i cache odpowiedzi
+        self.gateway = gateway or get_gateway(sync_client=client)
         self.context = context
         self.url_question = url_question
-        self.questions = self.load_questions()
+        # Pytania pobrane wcześniej (np. przez etap "questions") nie są pobierane ponownie
+        self.questions = questions if questions is not None else self.load_questions()
+        # Stały prefiks (prompt systemowy + kontekst) jest identyczny w każdym zapytaniu,
+        # więc dostawca może go cache'ować między pytaniami
+        self.prefix_messages = [
+            {"role": "system", "content": self.SYSTEM_PROMPT},
+            {"role": "user", "content": self.context},
+        ]
+        self.context_tokens = count_tokens(self.SYSTEM_PROMPT) + count_tokens(self.context)
+        self.usage = {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0,
+                      "packed_requests": 0, "packed_questions": 0}
+        self.usage_lock = threading.Lock()
+        # Pytania, na które ostatnie generate_answers_concurrently nie odpowiedziało: {id: wyjątek}
+        self.errors = {}
 
     def load_questions(self):
         """Pobiera pytania z URL-a i zapisuje je w słowniku."""
+        return SimpleAnswerer.fetch_questions(self.url_question)
+
+    @staticmethod
+    def fetch_questions(url_question):
+        """Zwraca słownik {id: pytanie} z pliku "id=pytanie" pod podanym URL-em."""
         try:
-            response = requests.get(self.url_question)
+            response = get_client().get(url_question)
             response.raise_for_status()
             questions_data = response.text.splitlines()
             questions = {}
@@ -244,25 +821,192 @@ class SimpleAnswerer:
             print(f"Error fetching questions: {e}")
             return {}
     
+    def record_usage(self, response, packed_questions=None):
+        usage = getattr(response, "usage", None)
+        details = getattr(usage, "prompt_tokens_details", None) if usage else None
+        with self.usage_lock:
+            self.usage["requests"] += 1
+            if packed_questions is not None:
+                self.usage["packed_requests"] += 1
+                self.usage["packed_questions"] += packed_questions
+            if usage:
+                self.usage["prompt_tokens"] += usage.prompt_tokens
+                self.usage["completion_tokens"] += usage.completion_tokens
+                self.usage["cached_tokens"] += getattr(details, "cached_tokens", 0) or 0
+
+    def report_usage(self):
+        """Wypisuje zużycie tokenów i oszczędności z cache prefiksu oraz pakowania pytań."""
+        usage = dict(self.usage)
+        # Każde pytanie spakowane z innymi nie wysyła kontekstu osobno
+        usage["packed_tokens_saved"] = (usage["packed_questions"] - usage["packed_requests"]) * self.context_tokens
+        usage["tokens_saved"] = usage["cached_tokens"] + usage["packed_tokens_saved"]
+        print(f"Token usage: {usage}")
+        return usage
+
+    def answer_question(self, question, client=None):
+        """Odpowiada na jedno pytanie na podstawie pełnego kontekstu."""
+        # Use GPT-4o to generate the answer
+        response = self.gateway.chat(
+            client=client or self.client,
+            model="gpt-4o",
+            messages=self.prefix_messages + [{"role": "user", "content": question}],
+            max_tokens=1000,
+            temperature=0,
+        )
+        self.record_usage(response)
+        return response.choices[0].message.content.strip()
+
+    def answer_packed(self, questions, client=None):
+        """Odpowiada na kilka pytań jednym zapytaniem ze strukturalną odpowiedzią JSON."""
+        response = self.gateway.chat(
+            client=client or self.client,
+            model="gpt-4o",
+            temperature=0,
+            messages=self.prefix_messages + [
+                {"role": "system", "content": self.PACKED_PROMPT},
+                {"role": "user", "content": json.dumps(
+                    [{"id": q_id, "question": question} for q_id, question in questions.items()],
+                    ensure_ascii=False,
+                )},
+            ],
+            response_format={
+                "type": "json_schema",
+                "json_schema": {
+                    "name": "answers",
+                    "strict": True,
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "answers": {
+                                "type": "array",
+                                "items": {
+                                    "type": "object",
+                                    "properties": {"id": {"type": "string"}, "answer": {"type": "string"}},
+                                    "required": ["id", "answer"],
+                                    "additionalProperties": False,
+                                },
+                            },
+                        },
+                        "required": ["answers"],
+                        "additionalProperties": False,
+                    },
+                },
+            },
+            max_tokens=200 * len(questions) + 200,
+        )
+        try:
+            items = json.loads(response.choices[0].message.content)["answers"]
+            answers = {item["id"]: item["answer"].strip() for item in items if item.get("id") in questions}
+        except (json.JSONDecodeError, KeyError, TypeError, AttributeError) as e:
+            print(f"Error parsing packed answers: {e}")
+            answers = {}
+        self.record_usage(response, len(answers))
+        return answers
+
+    @traced()
+    def generate_answers_packed(self, batch_size=10):
+        """Generuje odpowiedzi, wysyłając pytania paczkami po batch_size w jednym zapytaniu."""
+        print(self.questions)
+        answers = {}
+        q_ids = list(self.questions)
+        for i in range(0, len(q_ids), batch_size):
+            batch = {q_id: self.questions[q_id] for q_id in q_ids[i:i + batch_size]}
+            answers.update(self.answer_packed(batch))
+        # Pytania pominięte w odpowiedzi JSON dostają osobne zapytanie
+        for q_id in q_ids:
+            if q_id not in answers:
+                answers[q_id] = self.answer_question(self.questions[q_id])
+        return {q_id.strip(): answers[q_id] for q_id in q_ids}
+
+    @traced()
     def generate_answers_without_qa(self):
         """Generuje odpowiedzi na pytania."""
         answers = {}
         print(self.questions)
         for q_id, question in self.questions.items():
-            # Use GPT-4o to generate the answer
-            response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "You are an assistant for question-answering tasks. Use the following pieces of retrieved context to answer the question. Use one sentence and keep the answer concise."},
-                    {"role": "user", "content": self.context},
-                    {"role": "user", "content": question},
-                ],
-                max_tokens=1000,
-            )
-            answer = response.choices[0].message.content.strip()
-            answers[q_id.strip()] = answer
+            answers[q_id.strip()] = self.answer_question(question)
         return answers  
 
+    @traced()
+    def generate_answers_concurrently(self, max_concurrency=8, timeout=60, retries=3):
+        """Generuje odpowiedzi równolegle, z limitem czasu i ponowieniami dla każdego pytania."""
+        print(self.questions)
+        # Ponowienia obsługuje map_concurrently, więc klient ich nie powtarza
+        client = self.client.with_options(timeout=timeout, max_retries=0)
+
+        async def answer(question):
+            return await asyncio.to_thread(self.answer_question, question, client)
+
+        results = asyncio.run(map_concurrently(
+            self.questions, answer, max_concurrency=max_concurrency, timeout=timeout, retries=retries
+        ))
+        self.errors = {}
+        return Answerer.collect_answers(results, self.errors)
+
+def build_pipeline(client, openai_api_key, report_api_key, dir, url_article, url_question, url_answer):
+    """Zwraca StageRunner z etapami context, questions, knowledge_base, answers i report.
+
+    Wynik każdego etapu trafia do DIR/temp/stages pod kluczem z jego parametrów
+    i wyników poprzednich etapów, więc ponowne uruchomienie wykonuje tylko etapy
+    po pierwszej zmianie lub błędzie. Klucze API nie są parametrami etapów,
+    żeby nie trafiły do kluczy artefaktów.
+    """
+    from modules.StageRunner import StageRunner
+
+    # Bramka dla wszystkich etapów, z cache odpowiedzi w DIR/temp zamiast w bieżącym katalogu
+    get_gateway(sync_client=client, cache_dir=os.path.join(dir, "temp"))
+    runner = StageRunner(
+        os.path.join(dir, "temp", "stages"),
+        params={"url_article": url_article, "url_question": url_question, "url_answer": url_answer},
+    )
+
+    # Pobieranie strony i opisy mediów zostają jednym etapem, żeby media były przetwarzane w trakcie pobierania.
+    # Tekst bez opisu któregoś medium nie jest zapisywany, więc następne uruchomienie spróbuje ponownie
+    @runner.stage(params=["url_article"])
+    def context(url_article):
+        index_html = IndexHtml(client)
+        text_content = index_html.index_webpage(url_article, dir)
+        if text_content == "Failed to fetch webpage.":
+            raise RuntimeError(f"Failed to fetch {url_article}")
+        if index_html.failed_media:
+            raise RuntimeError(f"{len(index_html.failed_media)} media failed: {', '.join(index_html.failed_media)}")
+        return text_content
+
+    # Nie zależy od strony, więc biegnie równolegle z etapem context
+    @runner.stage(params=["url_question"])
+    def questions(url_question):
+        questions = SimpleAnswerer.fetch_questions(url_question)
+        if not questions:
+            raise RuntimeError(f"No questions at {url_question}")
+        return questions
+
+    # Indeks FAISS zostaje na dysku w DIR/temp/index; artefakt to tylko jego podsumowanie
+    @runner.stage(inputs=["context"])
+    def knowledge_base(context):
+        knowledge_db = KnowledgeDb(openai_api_key, index_dir=os.path.join(dir, "temp", "index"))
+        knowledge_db.build_vectorstore(context)
+        return {"chunks": len(knowledge_db.chunks), "index_dir": knowledge_db.index_dir}
+
+    @runner.stage(inputs=["context", "questions"])
+    def answers(context, questions):
+        simple_answerer = SimpleAnswerer(url_question, client, context, questions=questions)
+        answers = simple_answerer.generate_answers_concurrently()
+        print(answers)
+        simple_answerer.report_usage()
+        # Odpowiedzi z "Error in answering question." nie mogą zostać zapisane jako ukończony etap
+        if simple_answerer.errors:
+            raise RuntimeError(f"{len(simple_answerer.errors)} questions failed: {', '.join(simple_answerer.errors)}")
+        return answers
+
+    @runner.stage(inputs=["answers"], params=["url_answer"])
+    def report(answers, url_answer):
+        response = ReportSenderAnswerJson(report_api_key, "arxiv", url_answer).send_report(answers)
+        if response is None:
+            raise RuntimeError(f"Report to {url_answer} failed")
+        return response.text
+
+    return runner
+
 def main():
     # Ładowanie zmiennych środowiskowych z pliku .env
     load_dotenv()
@@ -274,35 +1018,22 @@ def main():
     url_article = os.getenv('URL_ARTICLE')
     url_question = os.getenv('URL_QUESTION') 
     url_answer = os.getenv('URL_ANSWER')   
-    dir = os.getenv('DIR')
-
+    dir = os.getenv('DIR', '.')
+    # Etapy do wykonania (z zależnościami) i etapy wykonywane mimo zapisanego wyniku
+    stages = os.getenv('STAGES', 'report').split(',')
+    force = [name for name in os.getenv('FORCE_STAGES', '').split(',') if name]
 
+    from openai import OpenAI
+    from modules.StageRunner import StageError
     client = OpenAI(api_key=openai_api_key)
-    
-    # index_html = IndexHtml(client)
-    # text_content = index_html.index_webpage(url_article, dir)
-    # # print(text_content)
-    
-    # knowledge_db = KnowledgeDb(api_key=openai_api_key)
-    # qa_chain = knowledge_db.prepare_knowledge_base(text_content)
-    
-    # answerer = Answerer(qa_chain, url_question)
-    # answers = answerer.generate_answers()
-    # print(answers)
-    
-    
-    #wersja z zastosowaniem simple answerera działa od strzała
-    
-    with open("C:\\Users\\kamyk\\Documents\\01_PROJECTS\\AI_DEVS_3\\aidevs3_s02e05\\temp\\context.txt", 'r', encoding='utf-8') as file:
-        context = file.read()
-    print(context)
-    simple_answerer = SimpleAnswerer(url_question, client, context )
-    answers = simple_answerer.generate_answers_without_qa()
-    print(answers)
-    report_sender = ReportSenderAnswerJson(report_api_key,"arxiv",url_answer)
-    report_sender.send_report(answers)
+
+    runner = build_pipeline(client, openai_api_key, report_api_key, dir, url_article, url_question, url_answer)
+    try:
+        runner.run(stages, force=force)
+    except (StageError, ValueError) as e:
+        print(f"Pipeline stopped: {e}")
+    get_gateway().report()
+    get_tracer().print_summary()
     
 if __name__ == "__main__":
     main()
-
-